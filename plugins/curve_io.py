@@ -0,0 +1,221 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Bulk read/write of curve splines through foreach_get/foreach_set.
+
+RNA stores curve coordinates as single floats, so the flat buffers are float32:
+a matching buffer type lets blender copy the whole block at once instead of
+walking the array item by item.
+"""
+
+from collections import OrderedDict
+import struct
+
+import numpy as np
+
+import track_geometry
+
+def read_float_attribute(collection, attribute, width=1):
+    """flat float attribute of every item in collection, shaped (len, width)"""
+    buffer = np.empty(len(collection) * width, dtype=np.float32)
+    collection.foreach_get(attribute, buffer)
+    buffer.shape = (len(collection), width) if width > 1 else (len(collection),)
+    return buffer
+
+def write_float_attribute(collection, attribute, values):
+    collection.foreach_set(attribute, np.ascontiguousarray(values, dtype=np.float32).ravel())
+
+def read_bool_attribute(collection, attribute):
+    """boolean attribute of every item in collection as a bool array"""
+    # flag backed booleans have no raw array access, a list buffer is what foreach_get accepts for them
+    buffer = [False] * len(collection)
+    collection.foreach_get(attribute, buffer)
+    return np.array(buffer, dtype=bool)
+
+def read_bezier_points(spline):
+    """co, handle_left, handle_right as (N, 3) and tilt, radius as (N,) arrays"""
+    points = spline.bezier_points
+    return (read_float_attribute(points, 'co', 3),
+            read_float_attribute(points, 'handle_left', 3),
+            read_float_attribute(points, 'handle_right', 3),
+            read_float_attribute(points, 'tilt'),
+            read_float_attribute(points, 'radius'))
+
+def read_bezier_selection(spline):
+    """per control point selection, a point counts as selected when itself or one of its handles is"""
+    points = spline.bezier_points
+    return (read_bool_attribute(points, 'select_control_point') |
+            read_bool_attribute(points, 'select_left_handle') |
+            read_bool_attribute(points, 'select_right_handle'))
+
+def bezier_selection_runs(curvedata):
+    """
+    (spline, start, count) of every run of consecutive selected control points in the bezier splines of curvedata.
+
+    Runs wrap around the start of cyclic splines, so the point indices of a run
+    are (start + arange(count)) % len(spline.bezier_points).
+    """
+    runs = []
+    for spline in curvedata.splines:
+        if spline.type == 'BEZIER':
+            for start, count in track_geometry.selection_runs(read_bezier_selection(spline), spline.use_cyclic_u):
+                runs.append((spline, start, count))
+    return runs
+
+def write_bezier_points(spline, co=None, handle_left=None, handle_right=None, tilt=None, radius=None):
+    """write whichever of the per control point arrays are given"""
+    points = spline.bezier_points
+    for attribute, values in (('co', co), ('handle_left', handle_left), ('handle_right', handle_right),
+                              ('tilt', tilt), ('radius', radius)):
+        if values is not None:
+            write_float_attribute(points, attribute, values)
+
+def read_poly_points(spline):
+    """(M, 3) coordinates of a poly/nurbs spline, the weight is dropped"""
+    return read_float_attribute(spline.points, 'co', 4)[:, :3]
+
+def read_poly_values(spline):
+    """tilt and radius of a poly/nurbs spline as (M,) arrays"""
+    return read_float_attribute(spline.points, 'tilt'), read_float_attribute(spline.points, 'radius')
+
+def write_poly_points(spline, points, weight=1.0, tilt=None, radius=None):
+    """set the coordinates, and tilt and radius if given, of a spline that already holds len(points) points"""
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+    co = np.empty((len(points), 4), dtype=np.float32)
+    co[:, :3] = points
+    co[:, 3] = weight
+    write_float_attribute(spline.points, 'co', co)
+    for attribute, values in (('tilt', tilt), ('radius', radius)):
+        if values is not None:
+            write_float_attribute(spline.points, attribute, values)
+
+def new_poly_spline(curvedata, points, weight=1.0, tilt=None, radius=None):
+    """append a POLY spline holding points to curvedata"""
+    polyline = curvedata.splines.new('POLY')
+    polyline.points.add(len(points) - 1)
+    write_poly_points(polyline, points, weight, tilt, radius)
+    return polyline
+
+class CenterlineCSV:
+    """
+    Reader for centerline exports: a 'Turn N' header line followed by x,y,z rows, repeated per track.
+
+    The file is scanned once in fixed size chunks to index the byte range of
+    every track, after which a single track is parsed on its own, again chunk
+    by chunk, so memory stays bounded by one track rather than the whole file.
+    """
+
+    def __init__(self, filename, chunk_size=1 << 22):
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self.index = None
+
+    def build_index(self):
+        """ordered {track name: (first byte, end byte)} of the rows of every track"""
+        headers = []
+        offset = 0
+        remainder = b''
+        with open(self.filename, 'rb') as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                lines = (remainder + chunk).split(b'\n')
+                remainder = lines.pop()
+                for line in lines:
+                    if line[:1] == b'T':
+                        headers.append((line.strip().decode(), offset, offset + len(line) + 1))
+                    offset += len(line) + 1
+
+        end = offset + len(remainder)
+        self.index = OrderedDict()
+        for i, (name, header, start) in enumerate(headers):
+            # a track's rows end where the next header starts
+            self.index[name] = (start, headers[i + 1][1] if i + 1 < len(headers) else end)
+        return self.index
+
+    @property
+    def names(self):
+        if self.index is None:
+            self.build_index()
+        return list(self.index.keys())
+
+    def read(self, name):
+        """(M, 3) float array of one track, parsed without touching the rest of the file"""
+        if self.index is None:
+            self.build_index()
+        start, stop = self.index[name]
+
+        arrays = []
+        remainder = b''
+        with open(self.filename, 'rb') as f:
+            f.seek(start)
+            left = stop - start
+            while left > 0:
+                chunk = f.read(min(self.chunk_size, left))
+                if not chunk:
+                    break
+                left -= len(chunk)
+                block = remainder + chunk
+                cut = block.rfind(b'\n') + 1 if left > 0 else len(block)
+                block, remainder = block[:cut], block[cut:]
+                values = block.replace(b'\r', b'').replace(b'\n', b',').strip(b', ')
+                if values:
+                    arrays.append(np.array(values.split(b','), dtype=np.float64))
+
+        values = np.concatenate(arrays) if arrays else np.zeros(0)
+        return values.reshape(-1, 3)
+
+    def tracks(self):
+        """(name, points) of every track, one track in memory at a time"""
+        for name in self.names:
+            yield name, self.read(name)
+
+# Binary sample file: 32 byte header (magic, version, bytes per float, sample count) then one packed
+# block per field in SAMPLE_FILE_FIELDS order, so every field can be memory mapped as a view.
+SAMPLE_FILE_MAGIC = b'SMPV'
+SAMPLE_FILE_VERSION = 1
+SAMPLE_FILE_HEADER = struct.Struct('<4sIIQ')
+SAMPLE_FILE_HEADER_SIZE = 32
+SAMPLE_FILE_FIELDS = (('co', 3), ('curvature', 1), ('tangent', 3), ('normal', 3), ('binormal', 3))
+
+def write_sample_file(filename, fields):
+    """write {field: array} of every SAMPLE_FILE_FIELDS entry, in the float size of fields['co']"""
+    dtype = np.dtype(fields['co'].dtype).newbyteorder('<')
+    with open(filename, 'wb') as f:
+        header = SAMPLE_FILE_HEADER.pack(SAMPLE_FILE_MAGIC, SAMPLE_FILE_VERSION, dtype.itemsize, len(fields['co']))
+        f.write(header.ljust(SAMPLE_FILE_HEADER_SIZE, b'\0'))
+        for field, width in SAMPLE_FILE_FIELDS:
+            f.write(np.ascontiguousarray(fields[field], dtype=dtype).tobytes())
+
+def read_sample_file(filename):
+    """{field: array} of a sample file, memory mapped so nothing is read until a field is used"""
+    with open(filename, 'rb') as f:
+        magic, version, itemsize, count = SAMPLE_FILE_HEADER.unpack(f.read(SAMPLE_FILE_HEADER.size))
+    if magic != SAMPLE_FILE_MAGIC or version != SAMPLE_FILE_VERSION:
+        raise ValueError('%s is not a version %d sample file' % (filename, SAMPLE_FILE_VERSION))
+
+    dtype = np.dtype('<f%d' % itemsize)
+    fields = OrderedDict()
+    offset = SAMPLE_FILE_HEADER_SIZE
+    for field, width in SAMPLE_FILE_FIELDS:
+        shape = (count, width) if width > 1 else (count,)
+        fields[field] = np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=shape) if count else np.zeros(shape, dtype)
+        offset += count * width * itemsize
+    return fields
@@ -0,0 +1,97 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Bulk read/write of meshes through foreach_get/foreach_set.
+
+Like curve_io, coordinates go through float32 buffers and indices through
+int32 buffers, matching RNA's storage so blender copies them in one block.
+"""
+
+import numpy as np
+
+from curve_io import read_float_attribute, write_float_attribute
+
+def read_int_attribute(collection, attribute, width=1):
+    """flat int attribute of every item in collection, shaped (len, width)"""
+    buffer = np.empty(len(collection) * width, dtype=np.int32)
+    collection.foreach_get(attribute, buffer)
+    buffer.shape = (len(collection), width) if width > 1 else (len(collection),)
+    return buffer
+
+def read_loop_polygons(mesh):
+    """polygon index of every loop, every polygon owning the loop_total loops from its loop_start"""
+    loop_start = read_int_attribute(mesh.polygons, 'loop_start')
+    loop_total = read_int_attribute(mesh.polygons, 'loop_total')
+    order = np.argsort(loop_start)
+    return np.repeat(order, loop_total[order])
+
+def write_int_attribute(collection, attribute, values):
+    collection.foreach_set(attribute, np.ascontiguousarray(values, dtype=np.int32).ravel())
+
+def read_polygons(mesh, size):
+    """(F, size) vertex indices of the polygons of mesh with size corners"""
+    loop_vertex = read_int_attribute(mesh.loops, 'vertex_index')
+    loop_start = read_int_attribute(mesh.polygons, 'loop_start')
+    loop_total = read_int_attribute(mesh.polygons, 'loop_total')
+    start = loop_start[loop_total == size]
+    return loop_vertex[start[:, None] + np.arange(size)]
+
+def add_polygons(mesh, faces):
+    """
+    Append faces (F, K) of K corners each to the polygons of mesh.
+
+    foreach_set writes whole collections, so the existing loops and polygons
+    are read and written back along with the new ones.
+    """
+    faces = np.asarray(faces, dtype=np.int32)
+    count, size = faces.shape
+    loops = len(mesh.loops)
+    loop_vertex = read_int_attribute(mesh.loops, 'vertex_index')
+    loop_start = read_int_attribute(mesh.polygons, 'loop_start')
+    loop_total = read_int_attribute(mesh.polygons, 'loop_total')
+
+    mesh.loops.add(count * size)
+    write_int_attribute(mesh.loops, 'vertex_index', np.concatenate((loop_vertex, faces.ravel())))
+    mesh.polygons.add(count)
+    write_int_attribute(mesh.polygons, 'loop_start',
+                        np.concatenate((loop_start, np.arange(loops, loops + count * size, size))))
+    write_int_attribute(mesh.polygons, 'loop_total', np.concatenate((loop_total, np.full(count, size))))
+    mesh.update(calc_edges=True)
+
+def write_polygon_mesh(mesh, verts, faces, loop_uvs=None, uv_name='UVMap'):
+    """
+    Fill an empty mesh with verts (V, 3) and faces (F, K) of K corners each.
+
+    loop_uvs (F, K, 2) are the uvs of every face corner, written to a new uv layer.
+    """
+    mesh.vertices.add(len(verts))
+    write_float_attribute(mesh.vertices, 'co', verts)
+    add_polygons(mesh, faces)
+
+    if loop_uvs is not None:
+        write_loop_uvs(mesh, loop_uvs, uv_name)
+    return mesh
+
+def write_loop_uvs(mesh, loop_uvs, uv_name=None):
+    """set the uv of every loop, in loop order, into uv_name or the active uv layer, creating it when missing"""
+    layer = mesh.uv_layers.get(uv_name) if uv_name else mesh.uv_layers.active
+    if layer is None:
+        # the texture face layer brings its loop uv layer along
+        layer = mesh.uv_layers[mesh.uv_textures.new(uv_name or 'UVMap').name]
+    write_float_attribute(layer.data, 'uv', loop_uvs)
@@ -6,6 +6,8 @@ bl_info = {
 import bpy
 from numpy import *
 
+import curve_io
+
 class ObjectSampleBezierCurve(bpy.types.Operator):
 	"""Object Cursor Array"""
 	bl_idname = "object.sample_bezier"
@@ -55,12 +57,7 @@ class ObjectSampleBezierCurve(bpy.types.Operator):
 		if (obj.type != 'CURVE'):
 			return
 
-		polyline = obj.data.splines.new('POLY')
-		polyline.points.add(len(points) - 1)
-
-		for i in range(len(points)):
-			x, y, z = points[i]
-			polyline.points[i].co = (x, y, z, 1)
+		curve_io.new_poly_spline(obj.data, points)
 
 	def sampleBezierCurveObject(self, obj):
 
@@ -5,6 +5,10 @@ bl_info = {
 
 import bpy
 from bpy_extras.io_utils import unpack_list
+from collections import OrderedDict
+import numpy as np
+
+import curve_io
 
 class ObjectTestAddon(bpy.types.Operator):
 	"""Test Addon Script"""				# blender will use this as a tooltip for menu items and buttons.
@@ -14,7 +18,6 @@ class ObjectTestAddon(bpy.types.Operator):
 
 	filename = "D:\Documents\Blender\data\Central.csv"
 	objname = "Central Curve"
-	vList = {'Total': []}
 
 	crosssection_obj = None
 	# curves = {}
@@ -38,19 +41,12 @@ class ObjectTestAddon(bpy.types.Operator):
 			polyline.points[i].co = (x, y, z, w)
 
 	def read(self):
-		
-		with open(self.filename, "r") as f:
-			trackname = ""
-			for line in f:
-				if (line[0] == 'T'):
-					trackname = line.split('\n')[0]
-					# print(trackname)
-					self.vList[trackname] = []
-				else:
-					x, y, z = [float(s) for s in line.split(',')]
-					self.vList[trackname].append((x, y, z))
-					self.vList['Total'].append((x, y, z))
-					# print(trackname, x, y, z)
+
+		# one track parsed at a time, 'Total' is joined once at the end instead of growing alongside
+		reader = curve_io.CenterlineCSV(self.filename)
+		self.vList = OrderedDict(reader.tracks())
+		if self.vList:
+			self.vList['Total'] = np.concatenate(list(self.vList.values()))
 
 	def makePolyLine(self, curvename, datalist):
 
@@ -61,13 +57,7 @@ class ObjectTestAddon(bpy.types.Operator):
 		objectdata.location = (0,0,0) 	#object origin
 		bpy.context.scene.objects.link(objectdata)
 
-		polyline = curvedata.splines.new('POLY')
-		polyline.points.add(len(datalist) - 1)
-
-		w = 1
-		for i in range(len(datalist)):
-			x, y, z = datalist[i]
-			polyline.points[i].co = (x, y, z, w)
+		curve_io.new_poly_spline(curvedata, datalist)
 
 		curvedata.bevel_object = self.crosssection_obj
 		curvedata.twist_mode = "Z_UP"
@@ -98,7 +88,7 @@ def unregister():
 	bpy.utils.unregister_class(ObjectTestAddon)
 
 
-# This allows you to run the script directly from blenders text editor
-# to test the addon without having to install it.
+# This allows you to run the script directly from blenders text editor to test the addon;
+# its curve_io import still needs the track tool add-on modules installed, see README.md.
 if __name__ == "__main__":
 	register()
\ No newline at end of file
@@ -0,0 +1,1220 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Array based geometry for the track tool.
+
+Nothing in here touches bpy: every function takes and returns numpy arrays,
+so the same code runs in operators, in worker threads and in plain python.
+
+A spline with N segments is passed around as a (N, 4, 3) array, one row per
+segment holding (co, handle_right, next handle_left, next co).
+"""
+
+import threading
+
+import numpy as np
+
+# handles closer than this to their control point count as "no handle"
+HANDLE_EPSILON = 1E-4
+
+# cubic bezier in power basis: B(t) = [1, t, t^2, t^3] . BEZIER_BASIS . [p0, p1, p2, p3]
+BEZIER_BASIS = np.array([
+    [ 1,  0,  0, 0],
+    [-3,  3,  0, 0],
+    [ 3, -6,  3, 0],
+    [-1,  3, -3, 1]], dtype=np.float64)
+
+def bernstein_matrix(t):
+    """(len(t), 4) bernstein weights for the parameters t"""
+    t = np.asarray(t, dtype=np.float64)
+    powers = np.vander(t, 4, increasing=True)
+    return powers.dot(BEZIER_BASIS)
+
+def bezier_segments(co, handle_left, handle_right, cyclic=False):
+    """(N, 4, 3) segment array from per control point arrays"""
+    count = len(co)
+    # the closing segment of a cyclic spline runs from the last point back to the first
+    nxt = np.roll(np.arange(count), -1)
+    if not cyclic:
+        nxt = nxt[:-1]
+    start = np.arange(len(nxt))
+
+    return np.stack((co[start], handle_right[start], handle_left[nxt], co[nxt]), axis=1).astype(np.float64)
+
+def straight_segments(segments):
+    """mask of segments whose both handles sit on their control points"""
+    # in design phase, two ends of a straight line get their handles sitting together with control points
+    left = np.linalg.norm(segments[:, 1] - segments[:, 0], axis=1)
+    right = np.linalg.norm(segments[:, 3] - segments[:, 2], axis=1)
+    return (left < HANDLE_EPSILON) & (right < HANDLE_EPSILON)
+
+def evaluate_segments(segments, t):
+    """evaluate every segment at the same parameters t, returns (N, len(t), 3)"""
+    weights = bernstein_matrix(t)
+    return np.einsum('rk,nkd->nrd', weights, segments)
+
+def join_segment_samples(segments, ends, cyclic=False):
+    """spline samples from the points each segment emits after its start point"""
+    samples = np.concatenate((segments[:1, 0], ends))
+    if cyclic:
+        samples = samples[:-1]
+    return np.ascontiguousarray(samples)
+
+def sample_segment_ends(segments, resolution, parameters=False):
+    """
+    Points of a fixed resolution per segment, without each segment's start point.
+
+    Straight segments (no handles) only emit their end point.
+    Returns the (K, 3) points in segment order and how many each segment emitted.
+    With parameters the points are (K, 4), their segment parameter t appended.
+    """
+    segments = np.asarray(segments, dtype=np.float64)
+    t = np.linspace(0, 1, resolution + 1)
+    points = evaluate_segments(segments, t)
+    if parameters:
+        t = np.broadcast_to(t[None, :, None], points.shape[:2] + (1,))
+        points = np.concatenate((points, t), axis=2)
+
+    keep = np.ones(points.shape[:2], dtype=bool)
+    keep[:, 0] = False
+    keep[straight_segments(segments), 1:-1] = False
+
+    return points[keep], keep.sum(axis=1)
+
+def segment_parameters(t, cyclic=False):
+    """
+    (segment index, t) of every joined sample from the t column of parameterized segment ends.
+
+    Every segment's ends finish at t = 1, which is where the next segment
+    starts; the spline's start point is prepended and the closing point of a
+    cyclic spline dropped, like join_segment_samples does with the points.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    index = np.concatenate(([0], np.cumsum(t[:-1] == 1)))
+    index, t = np.concatenate(([0], index)), np.concatenate(([0.0], t))
+    if cyclic:
+        index, t = index[:-1], t[:-1]
+    return index, t
+
+def interpolate_point_values(values, index, t):
+    """linear blend of per control point values (tilt, radius) at segment parameters"""
+    values = np.asarray(values, dtype=np.float64)
+    following = (index + 1) % len(values)
+    # values may hold several columns, one per kind of value
+    t = np.reshape(t, np.shape(t) + (1,) * (values.ndim - 1))
+    return values[index] * (1 - t) + values[following] * t
+
+def selection_runs(selected, cyclic=False):
+    """
+    (start, count) of every contiguous run of True items in selected, in order of their start.
+
+    On a cyclic sequence a run selected across the last and first item is one
+    run starting near the end, so start + count may exceed len(selected).
+    """
+    selected = np.asarray(selected, dtype=bool)
+    n = len(selected)
+    if n == 0 or not selected.any():
+        return []
+    if selected.all():
+        return [(0, n)]
+
+    edges = np.diff(np.concatenate(([0], selected.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    stops = np.flatnonzero(edges == -1)
+    runs = [(int(start), int(stop - start)) for start, stop in zip(starts, stops)]
+
+    if cyclic and selected[0] and selected[-1]:
+        first = runs.pop(0)
+        start, count = runs.pop()
+        runs.append((start, count + first[1]))
+    return runs
+
+class ArcLengthTable:
+    """
+    Cumulative arc length of a spline, measured on `resolution` chords per segment.
+
+    Built once with a single evaluation of every segment, then answers
+    station (arc length) and inverse (segment, t) queries with a binary search.
+    With projected=True lengths are measured on the x-y plane.
+    """
+
+    def __init__(self, segments, resolution=24, projected=False):
+        self.segments = np.asarray(segments, dtype=np.float64)
+        self.resolution = resolution
+
+        points = evaluate_segments(self.segments, np.linspace(0, 1, resolution + 1))
+        if projected:
+            points[..., 2] = 0
+        chords = np.linalg.norm(np.diff(points, axis=1), axis=2)
+        self.stations = np.concatenate(([0.0], np.cumsum(chords.ravel())))
+
+    @property
+    def length(self):
+        return self.stations[-1]
+
+    def station(self, segment, t=0.0):
+        """arc length at parameter t of segment, vectorized over both"""
+        u = np.clip(np.asarray(segment) + np.asarray(t, dtype=np.float64), 0, len(self.segments)) * self.resolution
+        index = np.minimum(np.floor(u).astype(np.int64), len(self.stations) - 2)
+        return self.stations[index] + (u - index) * (self.stations[index + 1] - self.stations[index])
+
+    def distance(self, start, end):
+        """arc length from control point start forward to control point end, wrapping on cyclic splines"""
+        start_station = self.station(start)
+        end_station = self.station(end)
+        return np.where(end_station >= start_station, end_station - start_station, self.length - start_station + end_station)
+
+    def locate(self, s):
+        """inverse lookup of arc lengths s, returns (segment, t) arrays"""
+        s = np.clip(np.asarray(s, dtype=np.float64), 0, self.length)
+        index = np.searchsorted(self.stations, s, side='right') - 1
+        index = np.clip(index, 0, len(self.stations) - 2)
+
+        chord = self.stations[index + 1] - self.stations[index]
+        fraction = np.where(chord > 0, (s - self.stations[index]) / np.where(chord > 0, chord, 1), 0)
+
+        u = (index + fraction) / self.resolution
+        segment = np.minimum(np.floor(u).astype(np.int64), len(self.segments) - 1)
+        return segment, u - segment
+
+    def evaluate(self, s):
+        """(len(s), 3) positions at arc lengths s"""
+        segment, t = self.locate(s)
+        weights = bernstein_matrix(np.atleast_1d(t))
+        return np.einsum('rk,rkd->rd', weights, self.segments[np.atleast_1d(segment)])
+
+    def resample(self, spacing):
+        """positions evenly spaced by (at most) spacing along the spline, both ends included"""
+        count = int(np.ceil(self.length / spacing)) + 1 if self.length > 0 else 1
+        return self.evaluate(np.linspace(0, self.length, count))
+
+# derivative of the power basis: B'(t) = [0, 1, 2t, 3t^2] . BEZIER_BASIS . P
+def bernstein_derivative_matrix(t):
+    """(len(t), 4) weights of the first derivative for the parameters t"""
+    t = np.asarray(t, dtype=np.float64)
+    powers = np.stack((np.zeros_like(t), np.ones_like(t), 2 * t, 3 * t * t), axis=1)
+    return powers.dot(BEZIER_BASIS)
+
+def _unit(vectors):
+    norm = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.where(norm > 0, vectors / np.where(norm > 0, norm, 1), 0)
+
+def _chord_error(q0, q1, q2, q3):
+    # distance of the inner control points to the chord bounds the curve's deviation (convex hull)
+    chord = q3 - q0
+    length2 = np.einsum('nd,nd->n', chord, chord)
+    safe = np.where(length2 > 0, length2, 1)
+    error = np.zeros(len(q0))
+    for q in (q1, q2):
+        u = np.clip(np.einsum('nd,nd->n', q - q0, chord) / safe, 0, 1)
+        error = np.maximum(error, np.linalg.norm(q0 + u[:, None] * chord - q, axis=1))
+    return error
+
+def flatten_segment_ends(segments, tolerance, angle_tolerance=None, max_depth=16, parameters=False):
+    """
+    Adaptive counterpart of sample_segment_ends.
+
+    Every segment is split in halves until each piece deviates less than
+    tolerance from its chord (and turns less than angle_tolerance, in radians,
+    if given), so straights collapse to their end points and hairpins get
+    as many points as they need. All pieces of one subdivision level are
+    tested together. parameters appends t to the points as for sample_segment_ends.
+    """
+    segments = np.asarray(segments, dtype=np.float64)
+
+    index = np.arange(len(segments))
+    a = np.zeros(len(segments))
+    b = np.ones(len(segments))
+    done_index, done_b = [], []
+
+    for depth in range(max_depth + 1):
+        parts = segments[index]
+        q0 = np.einsum('nk,nkd->nd', bernstein_matrix(a), parts)
+        q3 = np.einsum('nk,nkd->nd', bernstein_matrix(b), parts)
+        d0 = np.einsum('nk,nkd->nd', bernstein_derivative_matrix(a), parts)
+        d3 = np.einsum('nk,nkd->nd', bernstein_derivative_matrix(b), parts)
+        # control points of the piece [a, b] of the cubic
+        span = ((b - a) / 3)[:, None]
+        flat = _chord_error(q0, q0 + span * d0, q3 - span * d3, q3) <= tolerance
+        if angle_tolerance is not None:
+            cos_turn = np.einsum('nd,nd->n', _unit(d0), _unit(d3))
+            flat &= cos_turn >= np.cos(angle_tolerance)
+        if depth == max_depth:
+            flat[:] = True
+
+        done_index.append(index[flat])
+        done_b.append(b[flat])
+
+        split = ~flat
+        if not split.any():
+            break
+        mid = (a[split] + b[split]) * 0.5
+        index = np.repeat(index[split], 2)
+        a = np.stack((a[split], mid), axis=1).ravel()
+        b = np.stack((mid, b[split]), axis=1).ravel()
+
+    done_index = np.concatenate(done_index)
+    done_b = np.concatenate(done_b)
+    order = np.lexsort((done_b, done_index))
+    done_index, done_b = done_index[order], done_b[order]
+
+    ends = np.einsum('nk,nkd->nd', bernstein_matrix(done_b), segments[done_index])
+    if parameters:
+        ends = np.concatenate((ends, done_b[:, None]), axis=1)
+    return ends, np.bincount(done_index, minlength=len(segments))
+
+class SegmentSampleCache:
+    """
+    Samples of every segment of one spline, kept between resampling runs.
+
+    Entries are keyed by the exact bytes of the segment's (co, handle_right,
+    next handle_left, next co) together with the sampler settings, so after an
+    edit only the segments whose geometry changed are evaluated again, and
+    inserting or deleting a control point only misses its neighbours.
+    Updates are serialized, the cache may be shared with a worker thread.
+    """
+
+    def __init__(self):
+        self.settings = None
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def update(self, segments, sampler, settings):
+        """
+        Spline samples for segments, reusing cached segments.
+
+        sampler(segments) returns (ends, counts) like sample_segment_ends and is
+        only called on the missed segments; settings is any hashable describing
+        it. Returns the (M, 3) samples without the start point and cyclic
+        handling (see join_segment_samples) and the number of segments that missed.
+        """
+        with self.lock:
+            return self._update(segments, sampler, settings)
+
+    def _update(self, segments, sampler, settings):
+        segments = np.ascontiguousarray(segments, dtype=np.float64)
+        if settings != self.settings:
+            self.settings = settings
+            self.entries = {}
+
+        keys = [row.tobytes() for row in segments.reshape(len(segments), -1)]
+        missed = [i for i, key in enumerate(keys) if key not in self.entries]
+
+        entries = {}
+        if missed:
+            ends, counts = sampler(segments[missed])
+            for i, part in zip(missed, np.split(ends, np.cumsum(counts)[:-1])):
+                entries[keys[i]] = part
+        for key in keys:
+            if key not in entries:
+                entries[key] = self.entries[key]
+        # entries of segments that no longer exist are dropped here
+        self.entries = entries
+
+        parts = [entries[key] for key in keys]
+        ends = np.concatenate(parts) if parts else np.zeros((0, 3))
+        return ends, len(missed)
+
+# ----------- elevation profiles -----------
+# A profile gives elevation z and grade dz/ds at the stations s (projected arc length) of a
+# range of control points, from its first to its last station.
+
+def solve_banded(band, rhs):
+    """
+    Solve A x = rhs for a banded matrix without pivoting (A symmetric positive definite or diagonally dominant).
+
+    band is (n, 2p + 1) with band[i, p + j - i] = A[i, j], it is modified in place.
+    Gaussian elimination only walks the band, so the cost is O(n p^2).
+    """
+    n, width = band.shape
+    p = width // 2
+    rhs = np.array(rhs, dtype=np.float64)
+
+    for k in range(n - 1):
+        pivot_row = band[k, p:]
+        for i in range(k + 1, min(k + p + 1, n)):
+            offset = p + k - i
+            factor = band[i, offset] / band[k, p]
+            if factor:
+                band[i, offset:offset + p + 1] -= factor * pivot_row
+                rhs[i] -= factor * rhs[k]
+
+    x = np.zeros(n + p)
+    for k in range(n - 1, -1, -1):
+        x[k] = (rhs[k] - band[k, p + 1:].dot(x[k + 1:k + p + 1])) / band[k, p]
+    return x[:n]
+
+def linear_profile(s, z0, z1):
+    """constant grade between the end elevations"""
+    s = np.asarray(s, dtype=np.float64)
+    grade = (z1 - z0) / (s[-1] - s[0])
+    return z0 + (s - s[0]) * grade, np.full(len(s), grade)
+
+def hermite_profile(s, z0, z1, g0, g1):
+    """cubic vertical curve meeting the end elevations and grades (C1 with the track outside the range)"""
+    s = np.asarray(s, dtype=np.float64)
+    length = s[-1] - s[0]
+    u = (s - s[0]) / length
+
+    h00 = 2 * u ** 3 - 3 * u ** 2 + 1
+    h10 = u ** 3 - 2 * u ** 2 + u
+    h01 = -2 * u ** 3 + 3 * u ** 2
+    h11 = u ** 3 - u ** 2
+    z = h00 * z0 + h10 * length * g0 + h01 * z1 + h11 * length * g1
+
+    d00 = 6 * u ** 2 - 6 * u
+    d10 = 3 * u ** 2 - 4 * u + 1
+    d11 = 3 * u ** 2 - 2 * u
+    grade = (d00 * z0 - d00 * z1) / length + d10 * g0 + d11 * g1
+    return z, grade
+
+def clamped_spline_grades(s, z, g0, g1):
+    """grades at the stations of the C2 cubic spline through (s, z) with end grades g0, g1 (tridiagonal solve)"""
+    n = len(s)
+    h = np.diff(s)
+    delta = np.diff(z) / h
+
+    band = np.zeros((n, 3))
+    rhs = np.zeros(n)
+    band[0, 1] = band[-1, 1] = 1
+    rhs[0], rhs[-1] = g0, g1
+    # h_i m_{i-1} + 2 (h_{i-1} + h_i) m_i + h_{i-1} m_{i+1} = 3 (h_i delta_{i-1} + h_{i-1} delta_i)
+    band[1:-1, 0] = h[1:]
+    band[1:-1, 1] = 2 * (h[:-1] + h[1:])
+    band[1:-1, 2] = h[:-1]
+    rhs[1:-1] = 3 * (h[1:] * delta[:-1] + h[:-1] * delta[1:])
+
+    return solve_banded(band, rhs)
+
+def spline_profile(s, z, g0, g1, smoothness=1.0):
+    """
+    C2 vertical curve through smoothed elevations of the inner stations.
+
+    The inner elevations are smoothed by penalizing their second differences
+    (a pentadiagonal solve, with s scaled to [0, 1] so smoothness does not depend
+    on the range length; 0 keeps them, large values tend to a constant grade),
+    then a clamped cubic spline with the end grades runs through them.
+    """
+    s = np.asarray(s, dtype=np.float64)
+    z = np.asarray(z, dtype=np.float64)
+    # points sharing a station (zero length spans) are one point at their mean elevation, ends kept
+    stations, group = np.unique(s, return_inverse=True)
+    if len(stations) < len(s):
+        merged = np.bincount(group, z) / np.bincount(group)
+        merged[0], merged[-1] = z[0], z[-1]
+        smoothed, grades = spline_profile(stations, merged, g0, g1, smoothness)
+        return smoothed[group], grades[group]
+    n = len(s)
+    if n < 3:
+        return linear_profile(s, z[0], z[-1])
+
+    u = (s - s[0]) / (s[-1] - s[0])
+    h = np.diff(u)
+
+    # second difference rows: d_i = a_i y_{i-1} + b_i y_i + c_i y_{i+1}, weighted by their span
+    a = 2 / (h[:-1] * (h[:-1] + h[1:]))
+    c = 2 / (h[1:] * (h[:-1] + h[1:]))
+    b = -a - c
+    weight = smoothness * 0.5 * (h[:-1] + h[1:])
+
+    # normal equations (I + D^T W D) y = z, then fix both ends
+    band = np.zeros((n, 5))
+    band[:, 2] = 1
+    rows = np.arange(1, n - 1)
+    for offset_i, coeff_i in ((-1, a), (0, b), (1, c)):
+        for offset_j, coeff_j in ((-1, a), (0, b), (1, c)):
+            np.add.at(band, (rows + offset_i, 2 + offset_j - offset_i), weight * coeff_i * coeff_j)
+    rhs = z.copy()
+    for end in (0, n - 1):
+        band[end, :] = 0
+        band[end, 2] = 1
+    # move the known end values to the right hand side
+    for i in range(1, min(3, n - 1)):
+        rhs[i] -= band[i, 2 - i] * z[0]
+        band[i, 2 - i] = 0
+    for i in range(max(n - 3, 1), n - 1):
+        rhs[i] -= band[i, 2 + (n - 1 - i)] * z[-1]
+        band[i, 2 + (n - 1 - i)] = 0
+
+    smoothed = solve_banded(band, rhs)
+    return smoothed, clamped_spline_grades(s, smoothed, g0, g1)
+
+# ----------- road sweep -----------
+# A cross section profile is a (P, 2) array of (lateral, vertical) offsets, lateral positive to the
+# left of the direction of travel, listed from the left edge to the right edge so the swept faces
+# point up. Samples of a centerline are (N, 3) arrays; a cyclic centerline does not repeat its first point.
+
+def polyline_stations(points, cyclic=False):
+    """arc length at every point, a cyclic polyline gets one more station for the closing edge"""
+    points = np.asarray(points, dtype=np.float64)
+    if cyclic:
+        points = np.concatenate((points, points[:1]))
+    return np.concatenate(([0.0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))))
+
+def polyline_stations_rows(polylines):
+    """polyline_stations of every row of a (R, P, 3) array, as (R, P)"""
+    lengths = np.linalg.norm(np.diff(polylines, axis=1), axis=2)
+    return np.concatenate((np.zeros((len(polylines), 1)), np.cumsum(lengths, axis=1)), axis=1)
+
+def z_up_frames(points, cyclic=False):
+    """
+    (tangent, left, up) unit vectors at every point, twisted like blender's Z_UP mode.
+
+    The tangent bisects the adjacent edges, left stays horizontal and up is the
+    z axis tilted only as far as the grade needs. Points heading straight up or
+    down keep the frame of the point before them.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if cyclic:
+        edges = _unit(np.roll(points, -1, axis=0) - points)
+        tangent = edges + np.roll(edges, 1, axis=0)
+    else:
+        edges = _unit(np.diff(points, axis=0))
+        tangent = np.concatenate((edges[:1], edges[:-1] + edges[1:], edges[-1:]))
+    tangent = _unit(tangent)
+
+    left = np.cross((0.0, 0.0, 1.0), tangent)
+    valid = np.linalg.norm(left, axis=1) > HANDLE_EPSILON
+    if not valid.any():
+        left[:] = (0.0, 1.0, 0.0)
+    else:
+        # carry the last horizontal direction over vertical stretches
+        last = np.maximum.accumulate(np.where(valid, np.arange(len(left)), -1))
+        last[last < 0] = np.flatnonzero(valid)[0]
+        left = left[last]
+    left = _unit(left)
+    up = np.cross(tangent, left)
+    return tangent, left, up
+
+def grid_quads(rows, columns, cyclic=False, closed=False):
+    """
+    (row, column) index arrays, each (F, 4), of the quads between consecutive rows and columns.
+
+    Rows of a cyclic grid close back onto row 0, which shows up as row index
+    `rows` so per row data with one extra entry (like the stations) can be
+    looked up directly; take it modulo rows for vertex indices. closed does
+    the same for the columns, closing every row into a ring.
+    """
+    spans = rows if cyclic else rows - 1
+    column_spans = columns if closed else columns - 1
+    row, column = np.meshgrid(np.arange(spans), np.arange(column_spans), indexing='ij')
+    row, column = row.ravel(), column.ravel()
+    quad_rows = np.stack((row, row, row + 1, row + 1), axis=1)
+    quad_columns = np.stack((column, column + 1, column + 1, column), axis=1)
+    return quad_rows, quad_columns
+
+def station_values(stations, table, period=None):
+    """
+    Values at the stations from a table of (station, value) rows sorted by station.
+
+    Values are linear between rows and held beyond the first and last one; with
+    a period (the length of a closed track) the table wraps around instead.
+    """
+    table = np.asarray(table, dtype=np.float64).reshape(-1, 2)
+    return np.interp(stations, table[:, 0], table[:, 1], period=period)
+
+def road_profile(lane_width=3.5, lanes_left=1, lanes_right=1, camber=0.0,
+                 shoulder_width=0.0, shoulder_slope=None, curb_width=0.0, curb_height=0.0):
+    """
+    (P, 2) cross section of a crowned road, from its left to its right edge.
+
+    Every lane edge gets a profile point. The lanes fall away from the
+    centerline with the camber (a grade, 0.02 is 2%), shoulders continue with
+    shoulder_slope (the camber when None), and curbs stand curb_height above
+    the outer edge, curb_width wide.
+    """
+    if shoulder_slope is None:
+        shoulder_slope = camber
+
+    def side(lanes):
+        lateral = lane_width * np.arange(1, lanes + 1)
+        points = [np.stack((lateral, -camber * lateral), axis=1)]
+        edge, z = lane_width * lanes, -camber * lane_width * lanes
+        if shoulder_width > 0:
+            edge, z = edge + shoulder_width, z - shoulder_slope * shoulder_width
+            points.append([(edge, z)])
+        if curb_height > 0:
+            points.append([(edge, z + curb_height)])
+        if curb_width > 0:
+            points.append([(edge + curb_width, z + curb_height)])
+        return np.concatenate(points)
+
+    left = side(lanes_left)
+    right = side(lanes_right) * (-1, 1)
+    return np.concatenate((left[::-1], [(0.0, 0.0)], right))
+
+def sweep_profile(points, profile, cyclic=False, tilt=None, width=None, closed=False, stations=None):
+    """
+    Sweep a cross section along a centerline.
+
+    tilt (N,) banks the section about the tangent at every point, positive
+    angles raising the left edge, and width (N,) scales its lateral offsets.
+    A closed profile (a tunnel, a pipe) gets rings, its last point joined back
+    to its first, with u running on to the full perimeter over the seam.
+    stations replace the polyline's own arc lengths as v, laid out like
+    polyline_stations, so several levels of detail can share them.
+    Returns verts (N * P, 3), quad faces (F, 4) and per face corner uvs
+    (F, 4, 2), u running along the profile and v along the centerline's
+    stations, so the closing quads of a cyclic track end at v = length
+    instead of wrapping back to 0.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    profile = np.asarray(profile, dtype=np.float64)
+    tangent, left, up = z_up_frames(points, cyclic)
+    if tilt is not None:
+        cos, sin = np.cos(tilt)[:, None], np.sin(tilt)[:, None]
+        left, up = cos * left + sin * up, cos * up - sin * left
+
+    lateral = profile[None, :, 0, None]
+    if width is not None:
+        lateral = lateral * np.asarray(width, dtype=np.float64)[:, None, None]
+    verts = (points[:, None, :] + lateral * left[:, None, :]
+             + profile[None, :, 1, None] * up[:, None, :])
+
+    rows, columns = grid_quads(len(points), len(profile), cyclic, closed)
+    faces = (rows % len(points)) * len(profile) + columns % len(profile)
+
+    if stations is None:
+        stations = polyline_stations(points, cyclic)
+    across = polyline_stations(profile, closed)
+    uvs = np.stack((across[columns], stations[rows]), axis=2)
+    return verts.reshape(-1, 3), faces, uvs
+
+def simplify_polyline(points, tolerance, closed=False):
+    """
+    Indices of the points of a polyline kept by Douglas-Peucker simplification.
+
+    Points closer than tolerance to the chord of their kept neighbours are
+    dropped. A closed polyline is split at its first point and the point
+    furthest from it, so both halves keep their shape.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    count = len(points)
+    if count < 3 or tolerance <= 0:
+        return np.arange(count)
+    if points.shape[1] == 2:
+        # profiles are 2d, measure them in 3d like centerlines
+        points = np.concatenate((points, np.zeros((count, 1))), axis=1)
+
+    keep = np.zeros(count + 1 if closed else count, dtype=bool)
+    if closed:
+        # the first point repeated at the end closes the polyline
+        points = np.concatenate((points, points[:1]))
+        far = np.linalg.norm(points - points[0], axis=1).argmax()
+        keep[[0, far, count]] = True
+        spans = [(0, far), (far, count)]
+    else:
+        keep[[0, count - 1]] = True
+        spans = [(0, count - 1)]
+
+    while spans:
+        first, last = spans.pop()
+        if last - first < 2:
+            continue
+        inner = points[first + 1:last]
+        chord = points[last] - points[first]
+        length = np.linalg.norm(chord)
+        offset = inner - points[first]
+        if length > 0:
+            distance = np.linalg.norm(np.cross(offset, chord / length), axis=1)
+        else:
+            distance = np.linalg.norm(offset, axis=1)
+        worst = distance.argmax()
+        if distance[worst] > tolerance:
+            split = first + 1 + worst
+            keep[split] = True
+            spans.extend(((first, split), (split, last)))
+
+    kept = np.flatnonzero(keep)
+    return kept[kept < count]
+
+def strip_uvs(verts, columns, loop_vertex, loop_polygon, stations=None):
+    """
+    Track coordinate uvs of every loop of a mesh laid out like a sweep, `columns` vertices per row.
+
+    u is the distance along a vertex's row from the row's first vertex, v the
+    station of its row: `stations` holds one per row and the closing station
+    of a cyclic strip after them, by default the stations of the row middles
+    (halfway between their first and last vertex) along their chain. Polygons
+    spanning more than one row step close a cyclic strip, their row 0 loops
+    get the closing station as v. Vertices beyond the last full row are left
+    at u = v = 0.
+    """
+    verts = np.asarray(verts, dtype=np.float64)
+    rows = len(verts) // columns
+    grid = verts[:rows * columns].reshape(rows, columns, 3)
+
+    if stations is None:
+        stations = polyline_stations((grid[:, 0] + grid[:, -1]) * 0.5, cyclic=True)
+    stations = np.asarray(stations, dtype=np.float64)
+    across = polyline_stations_rows(grid)
+
+    vertex_row = np.arange(len(verts)) // columns
+    u = np.zeros(len(verts))
+    u[:rows * columns] = across.ravel()
+    vertex_row[rows * columns:] = 0
+
+    loop_row = vertex_row[loop_vertex]
+    polygon_row = np.zeros(loop_polygon.max() + 1 if len(loop_polygon) else 0, dtype=loop_row.dtype)
+    np.maximum.at(polygon_row, loop_polygon, loop_row)
+    loop_row = np.where(loop_row < polygon_row[loop_polygon] - 1, loop_row + rows, loop_row)
+
+    return np.stack((u[loop_vertex], stations[loop_row]), axis=1)
+
+def wrap_loop_stations(stations, loop_polygon, length):
+    """
+    Unwrap the stations of the loops of polygons crossing the start of a closed track.
+
+    A polygon spanning more than half the length is taken to cross it; the
+    minority of its loops on one side of the start moves over to the other
+    side (the far end on a tie), so v stays continuous within every polygon.
+    """
+    stations = np.asarray(stations, dtype=np.float64)
+    count = loop_polygon.max() + 1 if len(loop_polygon) else 0
+    polygon_max = np.full(count, -np.inf)
+    polygon_min = np.full(count, np.inf)
+    np.maximum.at(polygon_max, loop_polygon, stations)
+    np.minimum.at(polygon_min, loop_polygon, stations)
+
+    upper = stations > length * 0.5
+    loops = np.bincount(loop_polygon, minlength=count)
+    uppers = np.bincount(loop_polygon, weights=upper, minlength=count)
+    crossing = (polygon_max - polygon_min > length * 0.5)[loop_polygon]
+    raise_lower = (2 * uppers >= loops)[loop_polygon]
+
+    stations = np.where(crossing & raise_lower & ~upper, stations + length, stations)
+    return np.where(crossing & ~raise_lower & upper, stations - length, stations)
+
+def sample_centerline(kind, data, values, cyclic, resolution, tolerance=None):
+    """
+    (points, values, stations) of a centerline at a level of detail.
+
+    kind is 'BEZIER' with data the (N, 4, 3) segments, sampled at resolution
+    per segment, or adaptively within tolerance when given; or 'POLY' with data
+    the (M, 3) points, simplified within tolerance when given. values holds per
+    control point columns (tilt, radius) blended at the samples. Stations are
+    laid out like polyline_stations but measured on the full detail polyline,
+    so every level of detail of one centerline maps to the same v.
+    """
+    if kind == 'BEZIER':
+        if tolerance is None:
+            ends, counts = sample_segment_ends(data, resolution, parameters=True)
+        else:
+            ends, counts = flatten_segment_ends(data, tolerance, parameters=True)
+        points = join_segment_samples(data, ends[:, :3], cyclic)
+        index, t = segment_parameters(ends[:, 3], cyclic)
+        # chords of the table are the full detail polyline, straight segments included
+        table = ArcLengthTable(data, resolution)
+        stations = table.station(index, t)
+        if cyclic:
+            stations = np.concatenate((stations, [table.length]))
+        return points, interpolate_point_values(values, index, t), stations
+
+    full = polyline_stations(data, cyclic)
+    kept = simplify_polyline(data, tolerance, cyclic) if tolerance is not None else np.arange(len(data))
+    stations = np.concatenate((full[kept], full[-1:])) if cyclic else full[kept]
+    return np.asarray(data, dtype=np.float64)[kept], np.asarray(values, dtype=np.float64)[kept], stations
+
+def centerline_banking(values, stations, cyclic, width_table=None, bank_table=None):
+    """
+    tilt and width of every sample: the blended (tilt, radius) values, unless a
+    (station, value) table keyed by arc length takes over
+    """
+    tilt, width = values[:, 0], values[:, 1]
+    period = stations[-1] if cyclic else None
+    stations = stations[:len(values)]
+    if width_table is not None:
+        width = station_values(stations, width_table, period)
+    if bank_table is not None:
+        tilt = station_values(stations, bank_table, period)
+    return tilt, width
+
+def build_road(sources, profile, tolerance=None, width_table=None, bank_table=None):
+    """
+    (verts, faces, uvs) of the road swept along every centerline source, None without any.
+
+    sources are (kind, data, values, cyclic, resolution) tuples as taken by
+    sample_centerline. Only numpy goes in and out, so levels of detail can be
+    built in worker processes.
+    """
+    sweeps = []
+    for kind, data, values, cyclic, resolution in sources:
+        points, values, stations = sample_centerline(kind, data, values, cyclic, resolution, tolerance)
+        if len(points) < 2:
+            continue
+        tilt, width = centerline_banking(values, stations, cyclic, width_table, bank_table)
+        sweeps.append(sweep_profile(points, profile, cyclic, tilt, width, stations=stations))
+    return merge_sweeps(sweeps) if sweeps else None
+
+def merge_sweeps(sweeps):
+    """concatenate (verts, faces, uvs) of several sweeps into one, renumbering the faces"""
+    offsets = np.cumsum([0] + [len(verts) for verts, faces, uvs in sweeps[:-1]])
+    return (np.concatenate([verts for verts, faces, uvs in sweeps]),
+            np.concatenate([faces + offset for (verts, faces, uvs), offset in zip(sweeps, offsets)]),
+            np.concatenate([uvs for verts, faces, uvs in sweeps]))
+
+class CenterlineIndex:
+    """
+    Closest point queries against a sampled centerline, through a uniform grid of its edges.
+
+    Every edge is cut into pieces no longer than a cell and hashed into the
+    cells the bounding box of each piece covers (at most 2 x 2), so a long
+    straight is found from anywhere along it. A query measures its distance
+    to the edges of its own and the eight surrounding cells, which is exact
+    whenever the closest edge found is no further away than a cell; the rest
+    are asked again on a grid of twice the cell size. stations, laid out like
+    polyline_stations, replace the polyline's own arc lengths so results are
+    the curve's stations (see sample_centerline).
+    """
+
+    def __init__(self, points, cyclic=False, cell_size=None, stations=None):
+        self.points = np.asarray(points, dtype=np.float64)
+        self.cyclic = cyclic
+        self.stations = polyline_stations(self.points, cyclic) if stations is None else np.asarray(stations, dtype=np.float64)
+        count = len(self.points)
+        # edge i runs from sample i to sample i + 1
+        self.starts = np.arange(count if cyclic else max(count - 1, 0))
+        self.ends = (self.starts + 1) % max(count, 1)
+        if cell_size is None:
+            lengths = np.linalg.norm(self.points[self.ends, :2] - self.points[self.starts, :2], axis=1)
+            lengths = lengths[lengths > 0]
+            cell_size = np.median(lengths) if len(lengths) else 1.0
+        self.cell_size = cell_size
+        self.grids = {}
+
+    @property
+    def length(self):
+        return self.stations[-1]
+
+    def _grid(self, size):
+        """edge of every (cell, edge) entry sorted by cell, and the sorted cell keys"""
+        if size not in self.grids:
+            a = self.points[self.starts, :2]
+            ab = self.points[self.ends, :2] - a
+            pieces = np.maximum(np.ceil(np.linalg.norm(ab, axis=1) / size), 1).astype(np.int64)
+            edge = np.repeat(np.arange(len(pieces)), pieces)
+            piece = np.arange(len(edge)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+            p0 = a[edge] + (piece / pieces[edge])[:, None] * ab[edge]
+            p1 = a[edge] + ((piece + 1) / pieces[edge])[:, None] * ab[edge]
+            low = np.floor(np.minimum(p0, p1) / size).astype(np.int64)
+            high = np.floor(np.maximum(p0, p1) / size).astype(np.int64)
+
+            edges, keys = [], []
+            for offset in ((0, 0), (0, 1), (1, 0), (1, 1)):
+                cells = low + offset
+                covered = (cells <= high).all(axis=1)
+                edges.append(edge[covered])
+                keys.append(self._keys(cells[covered]))
+            edges, keys = np.concatenate(edges), np.concatenate(keys)
+            order = np.argsort(keys, kind='mergesort')
+            self.grids[size] = (edges[order], keys[order])
+        return self.grids[size]
+
+    @staticmethod
+    def _keys(cells):
+        # cell coordinates packed into one sortable key
+        return (cells[..., 0] << 32) + (cells[..., 1] & 0xffffffff)
+
+    def _closest_on_edges(self, query, edge):
+        """parameter along and distance to each edge for the matching query point"""
+        a = self.points[self.starts[edge]]
+        ab = self.points[self.ends[edge]] - a
+        span = np.einsum('ij,ij->i', ab, ab)
+        u = np.clip(np.einsum('ij,ij->i', query - a, ab) / np.where(span > 0, span, 1), 0, 1)
+        return u, np.linalg.norm(query - a - u[:, None] * ab, axis=1)
+
+    def nearest_edges(self, query):
+        """closest edge, parameter along it and distance to it for every (Q, 3) query point"""
+        query = np.asarray(query, dtype=np.float64)
+        nearest = np.zeros(len(query), dtype=np.int64)
+        along = np.zeros(len(query))
+        distance = np.full(len(query), np.inf)
+        pending = np.arange(len(query))
+        size = self.cell_size
+        extent = np.ptp(np.concatenate((self.points[:, :2], query[:, :2])), axis=0).max() if len(query) else 0
+
+        while len(pending):
+            if size > 2 * extent + self.cell_size:
+                # one cell holds everything, the search is exhaustive anyway
+                size = np.inf
+            if size == np.inf:
+                # against every edge, a bounded number of queries at a time
+                edges = len(self.starts)
+                step = max(1, (1 << 20) // max(edges, 1))
+                for chunk in range(0, len(pending), step):
+                    rows = pending[chunk:chunk + step]
+                    owner = np.repeat(rows, edges)
+                    candidate = np.tile(np.arange(edges), len(rows))
+                    u, d = self._closest_on_edges(query[owner], candidate)
+                    pick = d.reshape(len(rows), edges).argmin(axis=1) + np.arange(len(rows)) * edges
+                    nearest[rows], along[rows], distance[rows] = candidate[pick], u[pick], d[pick]
+                break
+
+            sorted_edges, sorted_keys = self._grid(size)
+            cells = np.floor(query[pending, :2] / size).astype(np.int64)
+            offsets = np.array([(i, j) for i in (-1, 0, 1) for j in (-1, 0, 1)])
+            keys = self._keys(cells[:, None, :] + offsets[None, :, :]).ravel()
+            first = np.searchsorted(sorted_keys, keys, 'left')
+            last = np.searchsorted(sorted_keys, keys, 'right')
+
+            # flatten every (query, candidate edge) pair
+            counts = last - first
+            owner = np.repeat(np.repeat(np.arange(len(pending)), 9), counts)
+            slot = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            candidate = sorted_edges[np.repeat(first, counts) + slot]
+            u, d = self._closest_on_edges(query[pending[owner]], candidate)
+
+            best = np.full(len(pending), np.inf)
+            np.minimum.at(best, owner, d)
+            hit = d == best[owner]
+            nearest[pending[owner[hit]]] = candidate[hit]
+            along[pending[owner[hit]]] = u[hit]
+            distance[pending] = best
+
+            pending = pending[best > size]
+            size *= 2
+        return nearest, along, distance
+
+    def project(self, query):
+        """
+        station, signed lateral offset (positive to the left) and distance of every
+        (Q, 3) query point's closest point on the centerline
+        """
+        query = np.asarray(query, dtype=np.float64)
+        edge, u, distance = self.nearest_edges(query)
+
+        a = self.points[self.starts[edge]]
+        ab = self.points[self.ends[edge]] - a
+        foot = a + u[:, None] * ab
+        station = self.stations[edge] + u * (self.stations[edge + 1] - self.stations[edge])
+        if self.cyclic:
+            # the end of the closing edge is the start again
+            station[station >= self.length] -= self.length
+        left = _unit(np.cross((0.0, 0.0, 1.0), ab))
+        offset = np.einsum('qd,qd->q', query - foot, left)
+        return station, offset, distance
+
+    def row_stations(self, first, last):
+        """
+        Stations of a chain of sweep rows following the centerline in order, from the
+        (R, 3) first and last vertex of every row, and the station closing the chain.
+
+        A row crosses the centerline at its sample, square to it, so the station
+        is where the line through its ends passes closest to an edge, looked for
+        on the edge closest to the row's middle and its neighbours; rows passing
+        none keep the middle's projection. The stations of a cyclic centerline
+        are kept increasing across its start.
+        """
+        first = np.asarray(first, dtype=np.float64)
+        last = np.asarray(last, dtype=np.float64)
+        nearest, u, distance = self.nearest_edges((first + last) * 0.5)
+        station = self.stations[nearest] + u * (self.stations[nearest + 1] - self.stations[nearest])
+        edges = len(self.starts)
+
+        row = last - first
+        closest = np.full(len(first), np.inf)
+        for shift in (-1, 0, 1):
+            edge = nearest + shift
+            valid = self.cyclic | ((edge >= 0) & (edge < edges))
+            edge = edge % edges
+            a = self.points[self.starts[edge]]
+            ab = self.points[self.ends[edge]] - a
+            # closest approach of the edge a + t ab and the row line first + r row
+            aa, ar, rr = (np.einsum('ij,ij->i', x, y) for x, y in ((ab, ab), (ab, row), (row, row)))
+            offset = a - first
+            ao, ro = np.einsum('ij,ij->i', ab, offset), np.einsum('ij,ij->i', row, offset)
+            denominator = aa * rr - ar * ar
+            t = (ar * ro - rr * ao) / np.where(denominator > 0, denominator, 1)
+            r = (ro + ar * t) / np.where(rr > 0, rr, 1)
+            gap = np.linalg.norm(offset + t[:, None] * ab - r[:, None] * row, axis=1)
+            passing = valid & (denominator > 0) & (t >= 0) & (t <= 1) & (gap < closest)
+            station[passing] = (self.stations[edge] + t * (self.stations[edge + 1] - self.stations[edge]))[passing]
+            closest[passing] = gap[passing]
+
+        if not self.cyclic:
+            return np.append(station, station[-1])
+        half = self.length * 0.5
+        steps = (np.diff(station) + half) % self.length - half
+        station = (station[0] + half) % self.length - half + np.concatenate(([0.0], np.cumsum(steps)))
+        return np.append(station, station[0] + self.length)
+
+# ----------- mesh index arrays -----------
+# Edges are (E, 2) vertex index arrays, faces (F, K).
+
+def edge_keys(edges, vertex_count):
+    """one integer per undirected edge, for set operations on edge arrays"""
+    edges = np.sort(np.asarray(edges, dtype=np.int64).reshape(-1, 2), axis=1)
+    return edges[:, 0] * vertex_count + edges[:, 1]
+
+def boundary_edges(edges, loop_edge):
+    """edges used by exactly one face; with no faces at all every edge counts"""
+    edges = np.asarray(edges).reshape(-1, 2)
+    if len(loop_edge) == 0:
+        return edges
+    return edges[np.bincount(loop_edge, minlength=len(edges)) == 1]
+
+def row_strip_edges(rows, columns, cyclic=False):
+    """(E, 2) boundary edges of a strip laid out row after row: its two outer rails, and its end rows unless cyclic"""
+    row = np.arange(rows if cyclic else rows - 1)
+    following = (row + 1) % rows
+    sides = [np.stack((row * columns + column, following * columns + column), axis=1) for column in (0, columns - 1)]
+    if not cyclic:
+        across = np.arange(columns - 1)
+        sides += [np.stack((end * columns + across, end * columns + across + 1), axis=1) for end in (0, rows - 1)]
+    return np.concatenate(sides)
+
+def row_strip_layout(vertex_count, boundary):
+    """
+    (columns, cyclic) of a strip laid out row after row, as swept, whose boundary
+    is exactly the given edge_keys; None when no row length fits.
+    """
+    boundary = np.unique(boundary)
+    for columns in range(2, vertex_count // 2 + 1):
+        if vertex_count % columns:
+            continue
+        rows = vertex_count // columns
+        for cyclic in (False, True):
+            # cheap count check before comparing the edges themselves
+            if len(boundary) != (2 * rows if cyclic else 2 * (rows - 1) + 2 * (columns - 1)):
+                continue
+            keys = np.unique(edge_keys(row_strip_edges(rows, columns, cyclic), vertex_count))
+            if np.array_equal(keys, boundary):
+                return columns, cyclic
+    return None
+
+def rebuild_strip(verts, edges, loop_edge, loop_vertex):
+    """
+    (verts, faces) of the quads of a strip or ring mesh facing up, None when they would lose vertices.
+
+    A mesh laid out row after row gets the quads between its rows, however many
+    vertices a row has. Otherwise quads are woven between the traced boundary
+    rails, which only covers a strip two vertices wide: a vertex of a face off
+    the rails (a crown line, a curb) gives None rather than being dropped.
+    Vertices no face uses are left out of a woven strip.
+    """
+    verts = np.asarray(verts, dtype=np.float64)
+    count = len(verts)
+    layout = row_strip_layout(count, edge_keys(boundary_edges(edges, loop_edge), count))
+    if layout is not None:
+        columns, cyclic = layout
+        rows = count // columns
+        row, column = grid_quads(rows, columns, cyclic)
+        return verts, faces_up(verts, row % rows * columns + column)
+
+    faces = weave_boundary(verts, edges, loop_edge)
+    if faces is None:
+        return None
+    on_rails = np.zeros(count, dtype=bool)
+    on_rails[faces] = True
+    if not on_rails[loop_vertex].all():
+        return None
+    return compact_vertices(verts, faces)
+
+def compact_vertices(verts, faces):
+    """drop the vertices no face uses, returning the kept verts and renumbered faces"""
+    faces = np.asarray(faces)
+    used, renumbered = np.unique(faces, return_inverse=True)
+    return verts[used], renumbered.reshape(faces.shape)
+
+def edge_adjacency(edges, vertex_count):
+    """CSR adjacency of an undirected edge array: neighbours of v are neighbours[offsets[v]:offsets[v + 1]]"""
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    source = np.concatenate((edges[:, 0], edges[:, 1]))
+    target = np.concatenate((edges[:, 1], edges[:, 0]))
+    order = np.argsort(source, kind='mergesort')
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(source, minlength=vertex_count))))
+    return offsets, target[order]
+
+def trace_loops(edges, vertex_count):
+    """
+    Vertex cycles of a set of boundary edges, every vertex on them having exactly two neighbours.
+
+    Returns a list of vertex index arrays, or None when the edges do not form
+    simple cycles (a vertex shared by more than two boundary edges, or a dead end).
+    """
+    offsets, neighbours = edge_adjacency(edges, vertex_count)
+    degree = np.diff(offsets)
+    if ((degree != 0) & (degree != 2)).any():
+        return None
+
+    # with two neighbours each, the next vertex is whichever neighbour we did not come from
+    first = np.full(vertex_count, -1, dtype=np.int64)
+    second = np.full(vertex_count, -1, dtype=np.int64)
+    on_loop = degree == 2
+    first[on_loop] = neighbours[offsets[:-1][on_loop]]
+    second[on_loop] = neighbours[offsets[:-1][on_loop] + 1]
+
+    loops = []
+    visited = ~on_loop
+    for start in np.flatnonzero(on_loop):
+        if visited[start]:
+            continue
+        loop = [start]
+        previous, current = start, int(first[start])
+        visited[start] = True
+        while current != start:
+            if visited[current]:
+                return None
+            visited[current] = True
+            loop.append(current)
+            previous, current = current, int(second[current] if first[current] == previous else first[current])
+        loops.append(np.array(loop, dtype=np.int64))
+    return loops
+
+def _turning(verts, loop):
+    """turning angle at every vertex of a closed vertex loop"""
+    points = verts[loop]
+    incoming = _unit(points - np.roll(points, 1, axis=0))
+    outgoing = _unit(np.roll(points, -1, axis=0) - points)
+    return np.arccos(np.clip(np.einsum('nd,nd->n', incoming, outgoing), -1, 1))
+
+def split_rails(verts, loop):
+    """
+    Two rails of an open strip from its single boundary loop.
+
+    The four sharpest turns are the strip's corners; of the two ways to pair
+    the opposite stretches between them, the shorter pair are the end caps.
+    Returns the rails running the same way, or None when they differ in length.
+    """
+    if len(loop) < 4:
+        return None
+    corners = np.sort(np.argsort(_turning(verts, loop))[-4:])
+    stretches = [np.roll(loop, -corners[i])[:(corners[(i + 1) % 4] - corners[i]) % len(loop) + 1] for i in range(4)]
+    lengths = [polyline_stations(verts[stretch])[-1] for stretch in stretches]
+    if lengths[0] + lengths[2] < lengths[1] + lengths[3]:
+        rail_a, rail_b = stretches[1], stretches[3]
+    else:
+        rail_a, rail_b = stretches[0], stretches[2]
+    rail_b = rail_b[::-1]
+    if len(rail_a) != len(rail_b):
+        return None
+    return rail_a, rail_b
+
+def align_rails(verts, loop_a, loop_b):
+    """
+    Second loop of a closed ring rotated and oriented to run alongside the first.
+
+    It starts at its vertex closest to the first loop's start and follows the
+    direction that keeps the paired stations closest; None when the loops differ in length.
+    """
+    if len(loop_a) != len(loop_b):
+        return None
+    start = np.linalg.norm(verts[loop_b] - verts[loop_a[0]], axis=1).argmin()
+    forward = np.roll(loop_b, -start)
+    backward = np.roll(forward[::-1], 1)
+
+    def fractions(rail):
+        stations = polyline_stations(verts[rail], cyclic=True)
+        return stations[:-1] / max(stations[-1], HANDLE_EPSILON)
+
+    # compare the station fractions along both loops in both directions
+    target = fractions(loop_a)
+    return min((forward, backward), key=lambda rail: np.abs(fractions(rail) - target).sum())
+
+def weave_rails(rail_a, rail_b, closed=False):
+    """(F, 4) quads between two rails of vertex indices running side by side"""
+    count = len(rail_a)
+    first = np.arange(count if closed else count - 1)
+    following = (first + 1) % count
+    return np.stack((rail_a[first], rail_a[following], rail_b[following], rail_b[first]), axis=1)
+
+def weave_boundary(verts, edges, loop_edge):
+    """
+    Quads woven between the boundary rails of a strip or ring mesh, whatever its vertex order.
+
+    The boundary edges are traced into loops: a single loop is an open strip
+    split at its end caps, two loops are the rails of a closed ring. Returns
+    the (F, 4) quads facing up, or None when the boundary is neither.
+    """
+    verts = np.asarray(verts, dtype=np.float64)
+    loops = trace_loops(boundary_edges(edges, loop_edge), len(verts))
+    if loops is None:
+        return None
+
+    if len(loops) == 1:
+        rails = split_rails(verts, loops[0])
+        closed = False
+    elif len(loops) == 2:
+        rails = loops[0], align_rails(verts, loops[0], loops[1])
+        closed = True
+    else:
+        return None
+    if rails is None or rails[1] is None or len(rails[0]) < 2:
+        return None
+
+    # rails come in either order
+    return faces_up(verts, weave_rails(rails[0], rails[1], closed))
+
+def faces_up(verts, faces):
+    """faces reversed when they point down on average, as a strip of a road should face up"""
+    verts = np.asarray(verts, dtype=np.float64)
+    faces = np.asarray(faces)
+    a, b, c = verts[faces[:, 0]], verts[faces[:, 1]], verts[faces[:, 2]]
+    if np.cross(b - a, c - b)[:, 2].sum() < 0:
+        faces = faces[:, ::-1]
+    return faces
+
+def ring_quads(rings, resolution, closed=False):
+    """
+    (F, 4) quads bridging stacked rings of resolution vertices each, ring i holding
+    the vertices from i * resolution on. closed also bridges the last ring to the first.
+    """
+    spans = rings if closed else rings - 1
+    ring, j = np.meshgrid(np.arange(spans), np.arange(resolution), indexing='ij')
+    ring, j = ring.ravel(), j.ravel()
+    bottom = ring * resolution
+    top = (ring + 1) % rings * resolution
+    following = (j + 1) % resolution
+    return np.stack((bottom + j, bottom + following, top + following, top + j), axis=1)
+
+def face_keys(faces):
+    """64 bit hash of every face's vertex set, equal for faces using the same vertices in any order"""
+    faces = np.sort(np.asarray(faces, dtype=np.uint64), axis=1)
+    keys = np.zeros(len(faces), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for column in faces.T:
+            # multiply-xorshift mixing, wrapping in uint64
+            keys = (keys ^ column) * np.uint64(0x9E3779B97F4A7C15)
+            keys ^= keys >> np.uint64(29)
+    return keys
+
+def new_faces(faces, existing=None):
+    """
+    faces minus those whose vertex set already exists, or comes earlier in faces.
+
+    Keys are compared in bulk; faces sharing a key with an existing one are
+    checked vertex by vertex so a hash collision never drops a face.
+    """
+    faces = np.asarray(faces)
+    sorted_faces = np.sort(faces, axis=1)
+    keys = face_keys(faces)
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    first = first[inverse]
+    unique = (first == np.arange(len(faces))) | (sorted_faces[first] != sorted_faces).any(axis=1)
+
+    if existing is not None and len(existing):
+        existing = np.asarray(existing)
+        existing_keys = face_keys(existing)
+        order = np.argsort(existing_keys)
+        position = np.clip(np.searchsorted(existing_keys, keys, sorter=order), 0, len(order) - 1)
+        match = order[position]
+        hit = existing_keys[match] == keys
+        hit[hit] = (np.sort(existing[match[hit]], axis=1) == sorted_faces[hit]).all(axis=1)
+        unique &= ~hit
+    return faces[unique]
@@ -30,14 +30,35 @@ bl_info = {
 #Imports:
 import bpy
 from bpy.types import Operator, Menu, Panel, UIList
-from bpy.props import BoolProperty, FloatProperty, IntProperty, StringProperty
+from bpy.props import BoolProperty, EnumProperty, FloatProperty, IntProperty, StringProperty
 from mathutils import Vector
 from math import floor
 import bmesh
-from numpy import *
+import numpy as np
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+import curve_io
+import mesh_io
+import track_geometry
 
 # *********** operators used in track tool ***************
 
+# per (object name, spline index) segment samples kept between Sample2Poly runs
+sample_caches = {}
+
+# caches of the bezier splines of obj, dropping those of splines and objects that are gone
+def sampleCaches(obj):
+    for name, index in list(sample_caches):
+        other = bpy.data.objects.get(name)
+        if other is None or other.type != 'CURVE' or index >= len(other.data.splines):
+            del sample_caches[(name, index)]
+    return [sample_caches.setdefault((obj.name, index), track_geometry.SegmentSampleCache())
+            for index in range(len(obj.data.splines))]
+
 class TrackTool_Operator_Align2XYPlane(Operator):
     """Brings all control points in the bezier curve onto xy plane"""
     bl_idname = "track.align_to_xy_plane"
@@ -77,125 +98,92 @@ class TrackTool_Operator_InterpolateElevation(Operator):
     bl_label = "Smooth Elevation"
     bl_options = {"REGISTER","UNDO"}
 
+    profile = EnumProperty(
+        name = "Profile",
+        description = "shape of the elevation over the projected length of the selected range",
+        items = (('LINEAR', "Linear", "constant grade between the end points"),
+                 ('CUBIC', "Cubic", "vertical curve meeting the grades of the track on both sides (C1)"),
+                 ('SPLINE', "Spline", "smoothed inner elevations joined by a C2 spline meeting the outer grades")),
+        default = 'LINEAR')
+
+    smoothness = FloatProperty(
+        name = "Smoothness",
+        description = "spline profile only: 0 keeps the inner elevations, larger values flatten them towards a constant grade",
+        min = 0.0, max = 1000.0,
+        default = 0.01)
+
     # All handles set to AUTO then back will change curve's plan-view shape - not work for all 
     # Interpolate only z between two selected points to guarantee a smotth elevation! - works only for sampled curve
     def smooth(self, obj):
-        selected, spline = self.getSelectedPoints(obj)
-        
-        if selected is None:
-            self.report({"ERROR"}, "Selected control points are not consecutive in one spline.")
+        # every run of consecutive selected points is smoothed on its own, single points have nothing to smooth
+        runs = [run for run in curve_io.bezier_selection_runs(obj.data) if run[2] > 1]
+        if not runs:
+            self.report({"ERROR"}, "Select at least two consecutive control points.")
             return
 
+        for spline, start, count in runs:
+            self.smoothRange(spline, start, count)
+        obj.data.update_tag()
+
+    def smoothRange(self, spline, start_index, count):
         loop_count = len(spline.bezier_points)
-        # selected is in the order of bezpoints from 0, need to rearrange it from the two ends fo the selected range
-        # Only two cases: 1.the gap is in between the dictionary elements, 2. the gap is just between the end and start of the dic elements
-        keylist = []
-        for key in selected:
-            keylist.append(key)
-        start_index = keylist[0]
-        end_index = keylist[-1]
-        prev_index = start_index
-        for key in keylist[1:]:
-            if (key - prev_index) % loop_count > 1:
-                start_index = key
-                end_index = prev_index
-            prev_index = key
+        # selection order from start, wrapping on cyclic splines
+        order = (start_index + np.arange(count)) % loop_count
+        end_index = order[-1]
+        inner = order[1:-1]
 
         print('Seletec smoothing range starts from %d to %d' % (start_index, end_index))
 
+        # handle types first, changing them recalculates handles that are overwritten below
+        for index in inner:
+            p = spline.bezier_points[int(index)]
+            if p.handle_left_type != 'ALIGNED' or p.handle_right_type != 'ALIGNED':
+                p.handle_left_type = 'FREE'
+                p.handle_right_type = 'FREE'
+                p.handle_left_type = 'ALIGNED'
+                p.handle_right_type = 'ALIGNED'
+
+        co, handle_left, handle_right, tilt, radius = curve_io.read_bezier_points(spline)
+        co, handle_left, handle_right = co.astype(np.float64), handle_left.astype(np.float64), handle_right.astype(np.float64)
+
+        # projected arc length of the whole spline is tabled once, distances are lookups into it
+        segments = track_geometry.bezier_segments(co, handle_left, handle_right, spline.use_cyclic_u)
+        table = track_geometry.ArcLengthTable(segments, spline.resolution_u, projected=True)
+        distance = np.round(table.distance(start_index, order), 4)
+        if distance[-1] <= 0:
+            self.report({"ERROR"}, "Selected control points have no length on x-y plane.")
+            return
+
         # start and end point should have smooth handle on x-y plane
-        z_total_diff = selected[end_index].co.z - selected[start_index].co.z
-        s_offset = 0
-        no_handles = []
-        distance = [0]
-        for i in range(len(selected)):
-            prev_index = (start_index + i - 1) % loop_count
-            current_index = (start_index + i) % loop_count
-            no_handles.append(self.has_no_handle(selected[current_index]))
-            if i == 0:
-                continue
-            s_offset += self.getProjectedDistance(selected[prev_index], selected[current_index], spline.resolution_u)
-            distance.append(round(s_offset, 4))
-        for i in range(len(selected)):
-            if i == 0 or i == len(selected) - 1:
-                continue
-            prev_index = (start_index + i - 1) % loop_count
-            current_index = (start_index + i) % loop_count
-            post_index = (start_index + i + 1) % loop_count
-            p = selected[current_index]
-            p.handle_left_type = 'FREE'
-            p.handle_right_type = 'FREE'
-            p.co.z = selected[start_index].co.z + distance[i] / distance[-1] * z_total_diff
-
-            if no_handles[i]:
-                p.handle_left.z = p.co.z
-                p.handle_right.z = p.co.z
-            
-            p.handle_left_type = 'ALIGNED'
-            p.handle_right_type = 'ALIGNED'
-
-    def has_no_handle(self, bezpoint):
-        return (bezpoint.handle_left - bezpoint.co).length < 1E-4 and (bezpoint.handle_right - bezpoint.co).length < 1E-4
-
-    # Tell if control point selected - if one handle of a control point is selected, the control point is selected
-    def is_selected(self, bezpoint):
-        return bezpoint.select_control_point or bezpoint.select_left_handle or bezpoint.select_right_handle
-
-    # Get Selected control points, valid only when selected control points are neighbors to one another
-    def getSelectedPoints(self, obj):
-        # Return empty dictionary<index, bezpoint> if not valid -> Change to return None
-        selected = {}
-        find_selected_in_prev_spline = False
-        in_spline = None
-        for spline in obj.data.splines:
-            if spline.type == 'BEZIER':
-                last_selected_point_index = -1
-                find_selected_in_cur_spline = False
-                isolated_selected_gap_count = 0
-                for i in range(len(spline.bezier_points)):
-                    p = spline.bezier_points[i]
-                    if self.is_selected(p):
-                        if not find_selected_in_cur_spline:
-                            find_selected_in_cur_spline = True
-                            in_spline = spline
-                        if find_selected_in_prev_spline:
-                            break
-                        if isolated_selected_gap_count > 1:
-                            break
-                        last_selected_point_index = i
-                        selected[i] = p
-                    else:
-                        # if p is not selected but its circular presessor is selected
-                        if find_selected_in_cur_spline and (i - last_selected_point_index) % len(spline.bezier_points) == 1:
-                            isolated_selected_gap_count += 1
-
-                # print(isolated_selected_gap_count, find_selected_in_cur_spline, find_selected_in_prev_spline)
-                if isolated_selected_gap_count > 1:
-                    selected.clear()
-                    break
-
-                if find_selected_in_cur_spline and find_selected_in_prev_spline:
-                    selected.clear()
-                    break
-
-                if find_selected_in_cur_spline and not find_selected_in_prev_spline:
-                    find_selected_in_prev_spline = True
-
-        return (selected, in_spline) if len(selected) > 1 else (None, None)
-
-    # Get distance on x-y plane between two control points according to their resolution
-    def getProjectedDistance(self, bezpoint1, bezpoint2, resolution):
-        p0 = bezpoint1.co.copy(); p0.z = 0
-        p1 = bezpoint1.handle_right.copy(); p1.z = 0
-        p2 = bezpoint2.handle_left.copy(); p2.z = 0
-        p3 = bezpoint2.co.copy(); p3.z = 0
-        prepoint = p0
-        distance = 0
-        for t in linspace(0, 1, resolution + 1):
-            point = (1-t)*(1-t)*(1-t)*p0 + 3*(1-t)*(1-t)*t*p1 + 3*(1-t)*t*t*p2 + t*t*t*p3
-            distance += linalg.norm(point - prepoint)
-            prepoint = point
-        return distance
+        z_start = co[start_index, 2]
+        z_end = co[end_index, 2]
+        if self.profile == 'LINEAR':
+            z, grade = track_geometry.linear_profile(distance, z_start, z_end)
+        else:
+            # the track outside the range enters along the start's left handle and leaves along the end's right handle
+            linear = (z_end - z_start) / distance[-1]
+            g0 = self.handleGrade(co[start_index], handle_left[start_index], -1, linear)
+            g1 = self.handleGrade(co[end_index], handle_right[end_index], 1, linear)
+            if self.profile == 'CUBIC':
+                z, grade = track_geometry.hermite_profile(distance, z_start, z_end, g0, g1)
+            else:
+                z, grade = track_geometry.spline_profile(distance, co[order, 2], g0, g1, self.smoothness)
+
+        # handles follow the profile's grade so no kinks appear at inner points
+        # (handles sitting on their control point get the control point's z, as before)
+        z, grade = z[1:-1], grade[1:-1]
+        co[inner, 2] = z
+        handle_left[inner, 2] = z - grade * np.linalg.norm(handle_left[inner, :2] - co[inner, :2], axis=1)
+        handle_right[inner, 2] = z + grade * np.linalg.norm(handle_right[inner, :2] - co[inner, :2], axis=1)
+
+        curve_io.write_bezier_points(spline, co=co, handle_left=handle_left, handle_right=handle_right)
+
+    # grade along a handle pointing direction (-1 backwards, 1 forwards), fallback for handles with no x-y length
+    def handleGrade(self, co, handle, direction, fallback):
+        run = np.linalg.norm(handle[:2] - co[:2])
+        if run < track_geometry.HANDLE_EPSILON:
+            return fallback
+        return direction * (handle[2] - co[2]) / run
 
     @classmethod
     def poll(cls, context):
@@ -215,108 +203,139 @@ class TrackTool_Operator_Sample2Poly(Operator):
 
     resolution = bpy.props.IntProperty(name="Resolution", default=2, min=1, max=100)
 
-    def sample(self, obj):
-        if bpy.data.objects.find(obj.name + '_sampled') == -1:
-            curve = bpy.data.curves.new(name=obj.name + '_sampled', type='CURVE')
-            curve.dimensions = '3D'
-            newobj = bpy.data.objects.new(obj.name + '_sampled', curve)
-            newobj.location = obj.location
-            bpy.context.scene.objects.link(newobj)
+    # adaptive mode follows curvature instead of the curve's fixed resolution_u
+    adaptive = BoolProperty(
+        name = "Adaptive",
+        description = "Subdivide each segment until it is within tolerance instead of using the curve resolution",
+        default = False)
+
+    tolerance = FloatProperty(
+        name = "Tolerance",
+        description = "maximum distance between the bezier curve and the sampled polyline",
+        min = 0.0001, max = 10.0,
+        default = 0.01)
+
+    angle_tolerance = FloatProperty(
+        name = "Angle Tolerance",
+        description = "maximum turning angle within one polyline edge",
+        subtype = 'ANGLE',
+        min = 0.001, max = 1.5708,
+        default = 0.0873)
 
-        sampledobj = bpy.data.objects[obj.name + '_sampled']
+    def sample(self, obj):
+        sampledobj = getSampledObject(obj)
         # sampledobj.select = True
         # obj.select = False
         # obj.hide = True
         # bpy.context.scene.objects.active = sampledobj
-        sampledobj.data.bevel_object = obj.data.bevel_object
-        sampledobj.data.twist_mode = 'Z_UP'
         self.resolution = obj.data.resolution_u
 
-        #clean sampledobj's spline
-        self.cleanSplines(sampledobj)
-
-        originalscale = obj.scale
-        #get sampled points for central line
-        for spline in obj.data.splines:
-            points = self.getSamplePoints(spline)
-            polyline = self.addSpline(sampledobj, points, originalscale)
-            polyline.use_cyclic_u = spline.use_cyclic_u
+        settings, sampler = makeSampler(self.adaptive, self.resolution, self.tolerance, self.angle_tolerance)
+        originalscale = tuple(obj.scale)
+        #get sampled points for central line, only segments edited since the last run are evaluated
+        sampled = []
+        for spline, cache in zip(obj.data.splines, sampleCaches(obj)):
+            segments, values = readSamplingInput(spline)
+            points, values, missed = sampleSegments(segments, values, spline.use_cyclic_u, cache, sampler, settings)
+            sampled.append((spline.use_cyclic_u, points, values, missed))
 
-    def cleanSplines(self, obj):
-        if (len(obj.data.splines)):
-            for spline in obj.data.splines:
-                obj.data.splines.remove(spline)
-
-    def addSpline(self, obj, points, scale):
-        # take original obj's scale into account
-        polyline = obj.data.splines.new('POLY')
-        polyline.points.add(len(points) - 1)
-
-        for i in range(len(points)):
-            x, y, z = points[i]
-            polyline.points[i].co = (x * scale.x, y * scale.y, z * scale.z, 1)
-
-        return polyline
-
-    def bezier(self, p0, p1, p2, p3, resolution):
-        points = []
-        # in design phase, two ends of a straight line get their handles sitting together with control points
-        # may be not sufficient valid for all cases, let's wait for bugs to appear
-        if (p1 - p0).length < 1E-4 and (p3 - p2).length < 1E-4:
-            points.append(p0)
-            points.append(p3)
-        else:    
-            for t in linspace(0, 1, resolution + 1):
-                point = (1-t)*(1-t)*(1-t)*p0 + 3*(1-t)*(1-t)*t*p1 + 3*(1-t)*t*t*p2 + t*t*t*p3
-                points.append(point)
-        return points
-
-    def getSamplePoints(self, spline):
-        points = []
-
-        for index in range(len(spline.bezier_points) - 1):
-
-            ctrlPnt = spline.bezier_points[index]
-            nextPnt = spline.bezier_points[index + 1]
-
-            if index == 0:
-                points += self.bezier(ctrlPnt.co, ctrlPnt.handle_right, nextPnt.handle_left, nextPnt.co, self.resolution)
-            else:
-                points += self.bezier(ctrlPnt.co, ctrlPnt.handle_right, nextPnt.handle_left, nextPnt.co, self.resolution)[1:]
+        writeSampledSplines(sampledobj, sampled, originalscale)
 
-        if spline.use_cyclic_u:
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        return obj and obj.select and obj.type == 'CURVE' and obj.data.splines[0].type == 'BEZIER'
 
-            ctrlPnt = spline.bezier_points[len(spline.bezier_points) - 1]
-            nextPnt = spline.bezier_points[0]
+    def execute(self, context):
+        obj = context.active_object
+        self.sample(obj)
 
-            points += self.bezier(ctrlPnt.co, ctrlPnt.handle_right, nextPnt.handle_left, nextPnt.co, self.resolution)[1:-1]
+        return {'FINISHED'}
 
-        return points
+class TrackTool_Operator_LiveSample(Operator):
+    """Toggle keeping the sampled polyline up to date while the bezier curve is edited"""
+    bl_idname = "track.live_sample"
+    bl_label = "Live Sample Bezier to Poly"
+    bl_options = {"REGISTER"}
+
+    adaptive = BoolProperty(
+        name = "Adaptive",
+        description = "Subdivide each segment until it is within tolerance instead of using the curve resolution",
+        default = False)
+
+    tolerance = FloatProperty(
+        name = "Tolerance",
+        description = "maximum distance between the bezier curve and the sampled polyline",
+        min = 0.0001, max = 10.0,
+        default = 0.01)
+
+    angle_tolerance = FloatProperty(
+        name = "Angle Tolerance",
+        description = "maximum turning angle within one polyline edge",
+        subtype = 'ANGLE',
+        min = 0.001, max = 1.5708,
+        default = 0.0873)
 
     @classmethod
     def poll(cls, context):
         obj = context.object
-        return obj and obj.select and obj.type == 'CURVE' and obj.data.splines[0].type == 'BEZIER'
+        return obj and obj.type == 'CURVE' and obj.data.splines and obj.data.splines[0].type == 'BEZIER'
 
     def execute(self, context):
         obj = context.active_object
-        self.sample(obj)
+        if obj.name in live_objects:
+            del live_objects[obj.name]
+            self.report({"INFO"}, "Live sampling of %s stopped" % obj.name)
+            return {'FINISHED'}
 
+        live_objects[obj.name] = makeSampler(self.adaptive, obj.data.resolution_u, self.tolerance, self.angle_tolerance)
+        live_edits[obj.name] = 0
+        startLiveSampling()
+        self.report({"INFO"}, "Live sampling of %s started" % obj.name)
         return {'FINISHED'}
 
 class TrackTool_Operator_GenerateRoad(Operator):
-    """Generate a straight line as road cross section"""
+    """Generate a road cross section from lanes, shoulders and curbs"""
     bl_idname = "track.generate_road_cross_section"
     bl_label = "Generate Road Cross Section"
     bl_options = {"REGISTER","UNDO"}
 
-    width = FloatProperty(
-        name = "width",
-        description = "width of the road crosssection",
+    lane_width = FloatProperty(
+        name = "Lane Width",
+        description = "width of every lane",
         min = 0.1, max = 100.0,
-        default = 10.0)
-
-    def generate(self, obj, width):
+        default = 5.0)
+
+    lanes_left = IntProperty(name="Left Lanes", description="lanes left of the central line", default=1, min=0, max=16)
+
+    lanes_right = IntProperty(name="Right Lanes", description="lanes right of the central line", default=1, min=0, max=16)
+
+    camber = FloatProperty(
+        name = "Camber",
+        description = "cross slope falling from the central line to both edges, 0.02 is 2%",
+        min = -0.5, max = 0.5,
+        default = 0.0)
+
+    shoulder_width = FloatProperty(
+        name = "Shoulder",
+        description = "width of the shoulder outside the outer lanes",
+        min = 0.0, max = 100.0,
+        default = 0.0)
+
+    curb_width = FloatProperty(
+        name = "Curb Width",
+        description = "width of the curb on top of both edges",
+        min = 0.0, max = 10.0,
+        default = 0.0)
+
+    curb_height = FloatProperty(
+        name = "Curb Height",
+        description = "height of the curb above the road edge",
+        min = 0.0, max = 10.0,
+        default = 0.0)
+
+    # banking is not part of the section: the curve's tilt rotates it when the mesh is built
+    def generate(self, obj):
         if bpy.data.objects.find('CrossSection') == -1:
             curve = bpy.data.curves.new(name='CrossSection', type='CURVE')
             curve.dimensions = '3D'
@@ -327,13 +346,13 @@ class TrackTool_Operator_GenerateRoad(Operator):
         targetobj = bpy.data.objects['CrossSection']
 
         #Clean CrossSection data
-        for spline in targetobj.data.splines:
-            targetobj.data.splines.remove(spline)
+        cleanSplines(targetobj)
 
-        poly = targetobj.data.splines.new('POLY')
-        poly.points.add(1)
-        poly.points[0].co = (self.width / 2, 0, 0, 1)
-        poly.points[1].co = (-self.width / 2, 0, 0, 1)
+        profile = track_geometry.road_profile(self.lane_width, self.lanes_left, self.lanes_right, self.camber,
+                                              self.shoulder_width, None, self.curb_width, self.curb_height)
+        points = np.zeros((len(profile), 3))
+        points[:, :2] = profile
+        curve_io.new_poly_spline(targetobj.data, points)
 
         if obj.data.bevel_object == None:
             obj.data.bevel_object = bpy.data.objects['CrossSection']
@@ -348,28 +367,52 @@ class TrackTool_Operator_GenerateRoad(Operator):
 
     def execute(self, context):
         obj = context.active_object
-        self.generate(obj, self.width)
+        self.generate(obj)
         return {'FINISHED'}
 
 class TrackTool_Operator_Convert2Mesh(Operator):
-    """Convert the beveled bezier curve to a mesh, meanwhile caculating uv map as a strip along central line"""
+    """Sweep the bevel cross section along the curve into a road mesh, with uv map as a strip along central line"""
     bl_idname = "track.convert_to_mesh"
     bl_label = "Reference Line Convert to Mesh"
     bl_options = {"REGISTER","UNDO"}
 
-    
+    lod_levels = IntProperty(
+        name = "LOD Levels",
+        description = "number of road meshes built, each with half the detail of the one before",
+        min = 1, max = 8,
+        default = 1)
+
+    lod_tolerance = FloatProperty(
+        name = "LOD Tolerance",
+        description = "distance the first reduced level may deviate from the curve",
+        min = 0.0001, max = 10.0,
+        default = 0.05)
+
+    # the sweep is built directly from arrays, so there are no doubles to remove and the faces already point up.
+    # Every level measures v on the full detail central line, so the uvs of all levels line up (and match Edit UV)
     def convert(self, obj):
-        bpy.ops.object.convert(target='MESH')
-        bpy.ops.object.mode_set(mode='EDIT')
-        bpy.ops.mesh.remove_doubles()
-        
-        bm = bmesh.from_edit_mesh(obj.data)
-        bmesh.ops.reverse_faces(bm, faces=bm.faces)
-        bm.normal_update()
-        bmesh.update_edit_mesh(obj.data)
+        profile = readCrossSection(obj.data.bevel_object)
+        if len(profile) < 2:
+            self.report({"ERROR"}, "Cross section needs at least two points.")
+            return
+
+        sources = readCenterlineSources(obj)
+        width_table, bank_table = readStationTables(obj)
+        jobs = [(sources, profile, lodTolerance(self.lod_tolerance, level), width_table, bank_table)
+                for level in range(self.lod_levels)]
+        roads = runInWorkers(track_geometry.build_road, jobs)
+        if roads[0] is None:
+            self.report({"ERROR"}, "Curve has no spline to sweep along.")
+            return
+
+        for level, (verts, faces, uvs) in enumerate(roads):
+            lodobj = getRoadObject(obj) if level == 0 else getMeshObject(obj, '%s_road_LOD%d' % (obj.name, level))
+            mesh_io.write_polygon_mesh(lodobj.data, verts, faces, uvs)
 
-        for v in obj.data.vertices:
-            v.select = True
+        roadobj = bpy.data.objects[obj.name + '_road']
+        obj.select = False
+        roadobj.select = True
+        bpy.context.scene.objects.active = roadobj
 
     @classmethod
     def poll(cls, context):
@@ -381,56 +424,186 @@ class TrackTool_Operator_Convert2Mesh(Operator):
         self.convert(obj)
         return {'FINISHED'}
 
+class TrackTool_Operator_SweepTrackside(Operator):
+    """Sweep trackside profiles (tunnels, guard rails, walls) along the curve, one mesh per level of detail"""
+    bl_idname = "track.sweep_trackside"
+    bl_label = "Sweep Trackside Profile"
+    bl_options = {"REGISTER","UNDO"}
+
+    profile = StringProperty(
+        name = "Profile",
+        description = "curve object whose splines are swept, x lateral and y vertical like the road cross section; cyclic splines make rings")
+
+    lod_levels = IntProperty(
+        name = "LOD Levels",
+        description = "number of meshes built, each with half the detail of the one before",
+        min = 1, max = 8,
+        default = 1)
+
+    lod_tolerance = FloatProperty(
+        name = "LOD Tolerance",
+        description = "distance the first reduced level may deviate from the curve and the profile",
+        min = 0.0001, max = 10.0,
+        default = 0.05)
+
+    # the sections follow the curve's banking but not its width, a wall keeps its shape where the road widens
+    def sweep(self, obj):
+        profileobj = bpy.data.objects.get(self.profile)
+        if profileobj is None or profileobj.type != 'CURVE':
+            self.report({"ERROR"}, "Profile curve '%s' not found." % self.profile)
+            return
+
+        profiles = [(points[:, :2], cyclic) for points, values, stations, cyclic in readCenterlines(profileobj) if len(points) >= 2]
+        if not profiles:
+            self.report({"ERROR"}, "Profile curve has no spline to sweep.")
+            return
+
+        width_table, bank_table = readStationTables(obj)
+        for level in range(self.lod_levels):
+            tolerance = lodTolerance(self.lod_tolerance, level)
+            sweeps = []
+            for points, values, stations, cyclic in readCenterlines(obj, tolerance):
+                if len(points) < 2:
+                    continue
+                tilt, width = track_geometry.centerline_banking(values, stations, cyclic, None, bank_table)
+                for profile, closed in profiles:
+                    kept = track_geometry.simplify_polyline(profile, tolerance or 0, closed)
+                    sweeps.append(track_geometry.sweep_profile(points, profile[kept], cyclic, tilt,
+                                                               closed=closed, stations=stations))
+            if not sweeps:
+                self.report({"ERROR"}, "Curve has no spline to sweep along.")
+                return
+
+            verts, faces, uvs = track_geometry.merge_sweeps(sweeps)
+            lodobj = getMeshObject(obj, '%s_%s_LOD%d' % (obj.name, profileobj.name, level))
+            mesh_io.write_polygon_mesh(lodobj.data, verts, faces, uvs)
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        return obj and obj.select and obj.type == 'CURVE'
+
+    def execute(self, context):
+        obj = context.active_object
+        self.sweep(obj)
+        return {'FINISHED'}
+
 class TrackTool_Operator_EditUV(Operator):
     """Calculate UV in track-coordinates"""
     bl_idname = "track.edit_uv"
     bl_label = "Edit UV"
     bl_options = {"REGISTER","UNDO"}
 
-    def calculate_uv(self, obj):
-        # !important. need to generate uv for mesh as physics tanget space along a track
-        if obj.mode == 'OBJECT':
-            bpy.ops.object.mode_set(mode='EDIT')
-
-        bm = bmesh.from_edit_mesh(obj.data)
+    mode = EnumProperty(
+        name = "Mode",
+        description = "how the track coordinates of the vertices are found",
+        items = (('STRIP', "Strip", "rows of cross section points in vertex order, as converted from the curve"),
+                 ('PROJECT', "Project", "project every vertex onto the central line curve, for edited or joined meshes")),
+        default = 'STRIP')
 
-        uv_layer = bm.loops.layers.uv.verify()
-        bm.faces.layers.tex.verify()    # currently blender needs both layers.
+    centerline = StringProperty(
+        name = "Central Line",
+        description = "curve object to project onto, the curve the mesh was converted from when empty")
 
-        # accumulative s in track coordinate for v
-        s = 0
-        # get width of the road
-        width = (obj.data.vertices[1].co - obj.data.vertices[0].co).length
-        width = round(width, 4)
+    def calculate_uv(self, obj):
+        # !important. need to generate uv for mesh as physics tanget space along a track
+        # u across the road and v as the station along its central line, for every loop at once
+        if obj.mode == 'EDIT':
+            bpy.ops.object.mode_set(mode='OBJECT')
 
-        # adjust UVs
-        for face in bm.faces:
-            vertices = {}
-            for loop in face.loops:
-                luv = loop[uv_layer]
-                vertex_index = loop.vert.index
-                vertices[vertex_index] = luv
-                # v = floor(vertex_index / 2)
-                # if vertex_index > v * 2:
-                #     u = 1
-                # else:
-                #     u = 0
-                # luv.uv = Vector((u, v))
-            vertex_indices = sorted(vertices.keys())
-            mid0 = (obj.data.vertices[vertex_indices[0]].co + obj.data.vertices[vertex_indices[1]].co) * 0.5
-            mid1 = (obj.data.vertices[vertex_indices[-2]].co + obj.data.vertices[vertex_indices[-1]].co) * 0.5
-            length = (mid1 - mid0).length
-
-            for i in range(len(vertex_indices)):
-                if i < 2:
-                    vertices[vertex_indices[i]].uv = Vector((width if i % 2 else 0, s))
-                else:
-                    vertices[vertex_indices[i]].uv = Vector((width if i % 2 else 0, s + length))
-            s += length
+        mesh = obj.data
+        verts = mesh_io.read_float_attribute(mesh.vertices, 'co', 3)
+        loop_vertex = mesh_io.read_int_attribute(mesh.loops, 'vertex_index')
+        loop_polygon = mesh_io.read_loop_polygons(mesh)
+        if self.mode == 'STRIP':
+            uvs = self.stripUVs(obj, verts, loop_vertex, loop_polygon)
+        else:
+            uvs = self.projectUVs(obj, verts, loop_vertex, loop_polygon)
+        if uvs is None:
+            return
+        mesh_io.write_loop_uvs(mesh, uvs)
 
-        bmesh.update_edit_mesh(obj.data)
+        bpy.ops.object.mode_set(mode='EDIT')
         bpy.ops.mesh.select_all(action='SELECT')
 
+    # the curve named by the centerline property, or the one a '<curve>_road' mesh was converted from
+    def findCenterline(self, obj):
+        name = self.centerline or (obj.name.rsplit('_road', 1)[0] if '_road' in obj.name else '')
+        curveobj = bpy.data.objects.get(name)
+        return curveobj if curveobj is not None and curveobj.type == 'CURVE' else None
+
+    # indices of the central line splines in the mesh's local space
+    def centerlineIndices(self, obj, curveobj, centerlines):
+        matrix = np.array(obj.matrix_world.inverted() * curveobj.matrix_world)
+        indices = []
+        for points, values, stations, cyclic in centerlines:
+            if len(points) >= 2:
+                points = points.dot(matrix[:3, :3].T) + matrix[:3, 3]
+                indices.append(track_geometry.CenterlineIndex(points, cyclic, stations=stations))
+        return indices
+
+    # u along every row and v as the station of the row, the row length read off the boundary of the strip
+    def stripUVs(self, obj, verts, loop_vertex, loop_polygon):
+        mesh = obj.data
+        edges = mesh_io.read_int_attribute(mesh.edges, 'vertices', 2)
+        loop_edge = mesh_io.read_int_attribute(mesh.loops, 'edge_index')
+        boundary = track_geometry.edge_keys(track_geometry.boundary_edges(edges, loop_edge), len(verts))
+        layout = track_geometry.row_strip_layout(len(verts), boundary)
+        if layout is None:
+            self.report({"ERROR"}, "Vertices are not in rows as converted from the curve, use Project mode.")
+            return None
+        columns, cyclic = layout
+        return track_geometry.strip_uvs(verts, columns, loop_vertex, loop_polygon, self.stripStations(obj, verts, columns))
+
+    # row stations along the central line for strip uvs: the curve's own sample stations when the rows
+    # are its samples (a converted mesh), else where the rows cross it (a level of detail); None without a curve
+    def stripStations(self, obj, verts, columns):
+        curveobj = self.findCenterline(obj)
+        rows = len(verts) // columns
+        if curveobj is None or rows < 2:
+            return None
+
+        centerlines = [centerline for centerline in readCenterlines(curveobj) if len(centerline[0]) >= 2]
+        if len(centerlines) == 1 and len(centerlines[0][0]) == rows:
+            points, values, stations, cyclic = centerlines[0]
+            return stations if cyclic else np.append(stations, stations[-1])
+
+        indices = self.centerlineIndices(obj, curveobj, centerlines)
+        if not indices:
+            return None
+        grid = verts.reshape(rows, columns, 3)
+        # the whole strip follows the spline closest to its row middles
+        middles = (grid[:, 0] + grid[:, -1]) * 0.5
+        index = min(indices, key=lambda index: index.project(middles)[2].sum())
+        return index.row_stations(grid[:, 0], grid[:, -1])
+
+    # u from the left edge of the road and v as the station of each vertex's closest point on the central line
+    def projectUVs(self, obj, verts, loop_vertex, loop_polygon):
+        curveobj = self.findCenterline(obj)
+        if curveobj is None:
+            self.report({"ERROR"}, "Central line curve '%s' not found." % (self.centerline or obj.name.rsplit('_road', 1)[0]))
+            return None
+
+        indices = self.centerlineIndices(obj, curveobj, readCenterlines(curveobj))
+        if not indices or len(verts) == 0:
+            self.report({"ERROR"}, "Nothing to project.")
+            return None
+
+        # a joined mesh may run along several splines, each vertex goes with the closest one
+        projections = [index.project(verts) for index in indices]
+        closest = np.argmin([distance for station, offset, distance in projections], axis=0)
+        rows = np.arange(len(verts))
+        station = np.array([station for station, offset, distance in projections])[closest, rows]
+        offset = np.array([offset for station, offset, distance in projections])[closest, rows]
+
+        v = station[loop_vertex]
+        for i, index in enumerate(indices):
+            if index.cyclic:
+                on_spline = closest[loop_vertex] == i
+                v[on_spline] = track_geometry.wrap_loop_stations(v[on_spline], loop_polygon[on_spline], index.length)
+        u = offset.max() - offset[loop_vertex]
+        return np.stack((u, v), axis=1)
+
     @classmethod
     def poll(cls, context):
         obj = context.object
@@ -447,70 +620,26 @@ class TrackTool_Operator_MeshConvert2Quad(Operator):
     bl_label = "Mesh Face to Quad"
     bl_options = {"REGISTER","UNDO"}
 
+    # converted roads are laid out row after row; other strips are rewoven between their two boundary rails
     def quadify(self, obj):
         if obj.mode == 'EDIT':
             bpy.ops.object.mode_set(mode='OBJECT')
 
-        bm = bmesh.new()
-        bm.from_mesh(obj.data)
-        
-        edges_to_remove = []
-        is_vindex_in_order = True
-        is_closed_ring = True
-
-        # delete all edges that is not a boundary (linked faces auto removed)
-        if bm.faces:
-            print('Removing all internal faces and edges')
-            for edge in bm.edges:
-                if not edge.is_boundary:
-                    edges_to_remove.append(edge)
-
-            for edge in edges_to_remove:
-                bm.edges.remove(edge)
-
-        if not bm.faces:
-            # with only boundary edge left, wave them to faces
-            for vindex, vert in enumerate(bm.verts):
-                #print(vindex, vert)
-                if vindex != vert.index:
-                    is_vindex_in_order = False
-                    break
-
-            # tell if original mesh is a closed ring - if vert0 and vert1 are isolated
-            bm.verts.ensure_lookup_table()
-            for edge in bm.verts[0].link_edges:
-                for vert in edge.verts:
-                    if vert.index == 1:
-                        is_closed_ring = False
-                        break
-
-            if is_vindex_in_order:
-                # wave
-                # v1 - v0
-                #  | - |
-                # v3 - v2
-                bm.verts.ensure_lookup_table()
-                for vert in bm.verts:
-                    if vert.index % 2:
-                        continue
-                    if not is_closed_ring and vert.index == len(bm.verts) - 2:
-                        continue
-                    v0 = vert
-                    v1 = bm.verts[(vert.index + 1) % len(bm.verts)]
-                    v2 = bm.verts[(vert.index + 2) % len(bm.verts)]
-                    v3 = bm.verts[(vert.index + 3) % len(bm.verts)]
-                    bm.faces.new([v0, v1, v3, v2])
-
-                bmesh.ops.reverse_faces(bm, faces=bm.faces)
+        mesh = obj.data
+        verts = mesh_io.read_float_attribute(mesh.vertices, 'co', 3)
+        edges = mesh_io.read_int_attribute(mesh.edges, 'vertices', 2)
+        loop_edge = mesh_io.read_int_attribute(mesh.loops, 'edge_index')
+        loop_vertex = mesh_io.read_int_attribute(mesh.loops, 'vertex_index')
 
-            else:
-                self.report({"ERROR"}, "Cannot wave according to vertex index, out of order")
+        strip = track_geometry.rebuild_strip(verts, edges, loop_edge, loop_vertex)
+        if strip is None:
+            self.report({"ERROR"}, "Vertices are neither in rows nor all on two boundary rails of equal vertex count, cannot wave")
+            return
+        verts, faces = strip
 
-            bm.normal_update()
-            bm.to_mesh(obj.data)
-            bm.free()
+        mesh_io.write_polygon_mesh(replaceMeshData(obj), verts, faces)
 
-            bpy.ops.object.mode_set(mode='EDIT')
+        bpy.ops.object.mode_set(mode='EDIT')
 
     @classmethod
     def poll(cls, context):
@@ -591,6 +720,263 @@ class TrackTool_Operator_Curve_ProportionalEdit(Operator):
         context.window_manager.modal_handler_add(self)
         return {'RUNNING_MODAL'}
 
+# ----------- sampling helpers shared by Sample2Poly and live sampling ---------------
+def getSampledObject(obj):
+    if bpy.data.objects.find(obj.name + '_sampled') == -1:
+        curve = bpy.data.curves.new(name=obj.name + '_sampled', type='CURVE')
+        curve.dimensions = '3D'
+        newobj = bpy.data.objects.new(obj.name + '_sampled', curve)
+        newobj.location = obj.location
+        bpy.context.scene.objects.link(newobj)
+
+    sampledobj = bpy.data.objects[obj.name + '_sampled']
+    sampledobj.data.bevel_object = obj.data.bevel_object
+    sampledobj.data.twist_mode = 'Z_UP'
+    return sampledobj
+
+# settings identify the sampler in the segment caches, samplers keep each sample's t to blend tilt and radius
+def makeSampler(adaptive, resolution, tolerance, angle_tolerance):
+    if adaptive:
+        return (('ADAPTIVE', tolerance, angle_tolerance),
+                lambda missed: track_geometry.flatten_segment_ends(missed, tolerance, angle_tolerance, parameters=True))
+    return (('FIXED', resolution),
+            lambda missed: track_geometry.sample_segment_ends(missed, resolution, parameters=True))
+
+# segments and (N, 2) tilt and radius of every control point of a bezier spline
+def readSamplingInput(spline):
+    co, handle_left, handle_right, tilt, radius = curve_io.read_bezier_points(spline)
+    segments = track_geometry.bezier_segments(co, handle_left, handle_right, spline.use_cyclic_u)
+    return segments, np.stack((tilt, radius), axis=1)
+
+# no bpy access in here, live sampling runs it on a worker thread
+def sampleSegments(segments, values, cyclic, cache, sampler, settings):
+    # returns the samples, the control point values blended at them and how many segments had to be evaluated again
+    if len(segments) == 0:
+        return np.zeros((0, 3)), np.zeros((0, 2)), 0
+
+    ends, missed = cache.update(segments, sampler, settings)
+    index, t = track_geometry.segment_parameters(ends[:, 3], cyclic)
+    return (track_geometry.join_segment_samples(segments, ends[:, :3], cyclic),
+            track_geometry.interpolate_point_values(values, index, t), missed)
+
+def cleanSplines(obj):
+    if (len(obj.data.splines)):
+        for spline in obj.data.splines:
+            obj.data.splines.remove(spline)
+
+# sampled is a list of (cyclic, points, (M, 2) tilt and radius, missed segment count) per source spline
+def writeSampledSplines(sampledobj, sampled, scale):
+    # take original obj's scale into account
+    sampled = [(cyclic, points * scale, values, missed) for cyclic, points, values, missed in sampled if len(points) >= 2]
+
+    # splice into the existing polylines when every spline kept its point count
+    polylines = sampledobj.data.splines
+    if len(polylines) == len(sampled) and all(polyline.type == 'POLY' and len(polyline.points) == len(points)
+                                              for polyline, (cyclic, points, values, missed) in zip(polylines, sampled)):
+        for polyline, (cyclic, points, values, missed) in zip(polylines, sampled):
+            # always write co: undo or a hand edit can change the polyline behind a cache hit
+            curve_io.write_poly_points(polyline, points)
+            curve_io.write_float_attribute(polyline.points, 'tilt', values[:, 0])
+            curve_io.write_float_attribute(polyline.points, 'radius', values[:, 1])
+            polyline.use_cyclic_u = cyclic
+        return
+
+    #clean sampledobj's spline
+    cleanSplines(sampledobj)
+
+    for cyclic, points, values, missed in sampled:
+        polyline = curve_io.new_poly_spline(sampledobj.data, points, tilt=values[:, 0], radius=values[:, 1])
+        polyline.use_cyclic_u = cyclic
+
+# ----------- live sampling ---------------
+# Edits of a live curve are noticed in scene_update_post, and once the curve has been quiet for
+# LIVE_SAMPLE_DELAY seconds its segments are read on the main thread and sampled on a worker thread.
+# The worker only touches numpy arrays; its results are written back by the handler on the main thread.
+# Loading a file drops the handler, so the live state goes with it; a None job ends the worker.
+LIVE_SAMPLE_DELAY = 0.3
+
+live_objects = {}       # object name -> (settings, sampler)
+live_edits = {}         # object name -> time of its last unsampled edit
+live_busy = set()       # object names with a job on the worker
+live_jobs = queue.Queue()
+live_results = queue.Queue()
+live_worker = None
+
+def liveSampleWorker():
+    while True:
+        job = live_jobs.get()
+        if job is None:
+            break
+        name, splines, sampler, settings, scale = job
+        try:
+            sampled = []
+            for cache, segments, values, cyclic in splines:
+                points, values, missed = sampleSegments(segments, values, cyclic, cache, sampler, settings)
+                sampled.append((cyclic, points, values, missed))
+        except Exception as e:
+            print('Live sampling of %s failed: %s' % (name, e))
+            sampled = None
+        live_results.put((name, sampled, scale))
+
+def liveSampleUpdate(scene):
+    # finished jobs
+    while not live_results.empty():
+        name, sampled, scale = live_results.get_nowait()
+        live_busy.discard(name)
+        if sampled is not None and name in live_objects and name in bpy.data.objects:
+            writeSampledSplines(getSampledObject(bpy.data.objects[name]), sampled, scale)
+
+    now = time.time()
+    for name in list(live_objects):
+        obj = bpy.data.objects.get(name)
+        if obj is None or obj.type != 'CURVE':
+            del live_objects[name]
+            continue
+        if obj.is_updated or obj.is_updated_data:
+            live_edits[name] = now
+
+    # debounce, and at most one job per object in flight
+    for name, edited in list(live_edits.items()):
+        if name in live_busy or now - edited < LIVE_SAMPLE_DELAY:
+            continue
+        del live_edits[name]
+        if name not in live_objects:
+            continue
+
+        obj = bpy.data.objects[name]
+        settings, sampler = live_objects[name]
+        scale = tuple(obj.scale)
+        # the caches are looked up here on the main thread, the worker only fills them
+        splines = [(cache,) + readSamplingInput(spline) + (spline.use_cyclic_u,)
+                   for spline, cache in zip(obj.data.splines, sampleCaches(obj)) if spline.type == 'BEZIER']
+        live_busy.add(name)
+        live_jobs.put((name, splines, sampler, settings, scale))
+
+def startLiveSampling():
+    global live_worker
+    if live_worker is None or not live_worker.is_alive():
+        live_worker = threading.Thread(target=liveSampleWorker, name='track_tool live sampling')
+        live_worker.daemon = True
+        live_worker.start()
+    if liveSampleUpdate not in bpy.app.handlers.scene_update_post:
+        bpy.app.handlers.scene_update_post.append(liveSampleUpdate)
+
+def stopLiveSampling():
+    global live_worker
+    live_objects.clear()
+    live_edits.clear()
+    live_busy.clear()
+    if liveSampleUpdate in bpy.app.handlers.scene_update_post:
+        bpy.app.handlers.scene_update_post.remove(liveSampleUpdate)
+
+    # drop what has not been sampled or written yet, then let the worker finish its current job and end
+    for pending in (live_jobs, live_results):
+        try:
+            while True:
+                pending.get_nowait()
+        except queue.Empty:
+            pass
+    if live_worker is not None:
+        live_jobs.put(None)
+        live_worker = None
+
+@bpy.app.handlers.persistent
+def liveSampleLoad(dummy):
+    stopLiveSampling()
+
+# ----------- road mesh ---------------
+# (kind, data, values, cyclic, resolution) of every spline in obj's local space, as taken by track_geometry.sample_centerline;
+# plain arrays, so they can be handed to worker processes
+def readCenterlineSources(obj):
+    sources = []
+    for spline in obj.data.splines:
+        if spline.type == 'BEZIER':
+            segments, values = readSamplingInput(spline)
+            sources.append(('BEZIER', segments, values, spline.use_cyclic_u, spline.resolution_u))
+        else:
+            values = np.stack(curve_io.read_poly_values(spline), axis=1)
+            sources.append(('POLY', curve_io.read_poly_points(spline), values, spline.use_cyclic_u, spline.resolution_u))
+    return sources
+
+# (points, (N, 2) tilt and radius, stations, cyclic) of every spline, beziers sampled at their own resolution like a bevel;
+# with a tolerance beziers are flattened adaptively and polylines simplified instead, for coarser detail levels
+def readCenterlines(obj, tolerance=None):
+    centerlines = []
+    for kind, data, values, cyclic, resolution in readCenterlineSources(obj):
+        points, values, stations = track_geometry.sample_centerline(kind, data, values, cyclic, resolution, tolerance)
+        centerlines.append((points, values, stations, cyclic))
+    return centerlines
+
+# sampling tolerance of a level of detail, level 0 is the curve's own resolution and every further level halves the detail
+def lodTolerance(tolerance, level):
+    return None if level == 0 else tolerance * 2 ** (level - 1)
+
+# keyed tables on the curve object take over from the point radius and tilt: custom properties
+# 'track_width' (lateral scale) and 'track_bank' (radians), [station, value, station, value, ...]
+def readStationTables(obj):
+    return tuple(np.array(obj[name], dtype=np.float64) if name in obj else None for name in ('track_width', 'track_bank'))
+
+# seconds the worker processes get for a batch before it is built in blender instead
+WORKER_TIMEOUT = 60
+
+# results of function(*job) for every job, in worker processes when there is more than one;
+# blender's own executable cannot host them, they run its bundled python instead. Workers that
+# fail to start are respawned by the pool forever, so the batch is waited on with a timeout
+def runInWorkers(function, jobs):
+    python = bpy.app.binary_path_python
+    if len(jobs) > 1 and python and os.path.isfile(python) and os.access(python, os.X_OK):
+        pool = None
+        try:
+            context = multiprocessing.get_context('spawn')
+            context.set_executable(python)
+            pool = context.Pool(min(len(jobs), multiprocessing.cpu_count()))
+            return pool.starmap_async(function, jobs).get(WORKER_TIMEOUT)
+        except Exception as e:
+            print('Worker processes unavailable, building in blender: %r' % e)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+    return [function(*job) for job in jobs]
+
+# (P, 2) profile from the first spline of a bevel object, its x is lateral and y vertical as in a bevel
+def readCrossSection(bevelobj):
+    centerlines = readCenterlines(bevelobj)
+    if not centerlines:
+        return np.zeros((0, 2))
+    points, values, stations, cyclic = centerlines[0]
+    if cyclic:
+        points = np.concatenate((points, points[:1]))
+    return points[:, :2]
+
+# mesh object next to obj holding its road, the previous mesh is replaced on every build
+def getRoadObject(obj):
+    return getMeshObject(obj, obj.name + '_road')
+
+# mesh object generated from obj, placed like it and emptied for a new build
+def getMeshObject(obj, name):
+    if bpy.data.objects.find(name) == -1:
+        newobj = bpy.data.objects.new(name, bpy.data.meshes.new(name))
+        bpy.context.scene.objects.link(newobj)
+
+    meshobj = bpy.data.objects[name]
+    replaceMeshData(meshobj)
+    meshobj.matrix_world = obj.matrix_world
+    return meshobj
+
+# swap an empty mesh in for obj's mesh, keeping its name and materials; RNA cannot delete geometry in place
+def replaceMeshData(obj):
+    oldmesh = obj.data
+    name = oldmesh.name
+    mesh = bpy.data.meshes.new(name)
+    for material in oldmesh.materials:
+        mesh.materials.append(material)
+    obj.data = mesh
+    if oldmesh.users == 0:
+        bpy.data.meshes.remove(oldmesh)
+        mesh.name = name
+    return mesh
+
 # ----------- helpers ---------------
 def drawLine(start, end, location):
 
@@ -722,6 +1108,7 @@ class TrackTool_Panel_RefernceLine(TrackToolPanel, Panel):
         if label:
             layout.label(text="Sample Bezier Curve")
         layout.operator("track.sample_to_poly", text="Sample To Polyline")
+        layout.operator("track.live_sample", text="Live Sampling")
 
     @staticmethod
     def draw_proportion_edit(layout, label=False):
@@ -765,6 +1152,7 @@ class TrackTool_Panel_Mesh(TrackToolPanel, Panel):
 
         col = layout.column(align=True)
         col.operator("track.convert_to_mesh", text="Convert to Mesh", icon="MESH_DATA")
+        col.operator("track.sweep_trackside", text="Sweep Trackside", icon="MOD_CURVE")
         col.operator("track.edit_uv", text="Edit UV", icon="MATSPHERE")
         col.operator("track.mesh_quadify", text="Use Quad Face", icon="MESH_PLANE")
 
@@ -788,12 +1176,16 @@ class TrackTool_Panel_Helper(TrackToolPanel, Panel):
         col.operator("mesh.loop_detail", text="Mesh Detail", icon="MESH_DATA")
 
 def register():
+    bpy.app.handlers.load_post.append(liveSampleLoad)
+
     bpy.utils.register_class(TrackTool_Operator_Align2XYPlane)
     bpy.utils.register_class(TrackTool_Operator_InterpolateElevation)
     bpy.utils.register_class(TrackTool_Operator_Sample2Poly)
+    bpy.utils.register_class(TrackTool_Operator_LiveSample)
     bpy.utils.register_class(TrackTool_Operator_GenerateRoad)
     bpy.utils.register_class(TrackTool_Operator_Curve_ProportionalEdit)
     bpy.utils.register_class(TrackTool_Operator_Convert2Mesh)
+    bpy.utils.register_class(TrackTool_Operator_SweepTrackside)
     bpy.utils.register_class(TrackTool_Operator_EditUV)
     bpy.utils.register_class(TrackTool_Operator_MeshConvert2Quad)
     bpy.utils.register_class(TrackTool_Operator_MeshFlipNormal)
@@ -808,12 +1200,18 @@ def register():
     bpy.utils.register_class(TrackTool_Panel_Helper)
 
 def unregister():
+    stopLiveSampling()
+    if liveSampleLoad in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(liveSampleLoad)
+
     bpy.utils.unregister_class(TrackTool_Operator_Align2XYPlane)
     bpy.utils.unregister_class(TrackTool_Operator_InterpolateElevation)
     bpy.utils.unregister_class(TrackTool_Operator_Sample2Poly)
+    bpy.utils.unregister_class(TrackTool_Operator_LiveSample)
     bpy.utils.unregister_class(TrackTool_Operator_GenerateRoad)
     bpy.utils.unregister_class(TrackTool_Operator_Curve_ProportionalEdit)
     bpy.utils.unregister_class(TrackTool_Operator_Convert2Mesh)
+    bpy.utils.unregister_class(TrackTool_Operator_SweepTrackside)
     bpy.utils.unregister_class(TrackTool_Operator_EditUV)
     bpy.utils.unregister_class(TrackTool_Operator_MeshConvert2Quad)
     bpy.utils.unregister_class(TrackTool_Operator_MeshFlipNormal)
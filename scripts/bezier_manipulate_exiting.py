@@ -128,9 +128,10 @@ def addPoly2Object(curvedata, points):
 	polyline = curvedata.splines.new('POLY')
 	polyline.points.add(len(points) - 1)
 
-	for i in range(len(points)):
-		x, y, z = points[i]
-		polyline.points[i].co = (x, y, z, 1)
+	# one flat (x, y, z, w) buffer for all points instead of a write per point
+	co = ones((len(points), 4), dtype=float32)
+	co[:, :3] = points
+	polyline.points.foreach_set('co', co.ravel())
 
 def addCurveObject(objname):
 
@@ -0,0 +1,55 @@
+import os
+import sys
+import numpy as np
+
+# the grid index lives with the blender add-ons, it does not need bpy
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'plugins'))
+from track_geometry import CenterlineIndex
+
+#distance of every query point to its closest edge, against every edge at once
+def bruteForceDistance(index, query):
+
+	a = index.points[index.starts]
+	ab = index.points[index.ends] - a
+	span = np.einsum('ij,ij->i', ab, ab)
+	u = np.clip(np.einsum('qij,ij->qi', query[:, None] - a, ab) / np.where(span > 0, span, 1), 0, 1)
+
+	return np.linalg.norm(query[:, None] - a - u[..., None] * ab, axis=2).min(axis=1)
+
+#a 200 m straight 8 m from a densely sampled leg running back parallel to it
+def longStraight():
+
+	leg = np.stack((np.linspace(200, 0, 400), np.full(400, 8.0), np.zeros(400)), axis=1)
+	points = np.concatenate(([(0, 0, 0), (200, 0, 0), (200, 4, 0)], leg))
+	index = CenterlineIndex(points, cyclic=True)
+	station, offset, distance = index.project(np.array([(100, 0.5, 0)]))
+
+	print("long straight: station %.3f offset %.3f distance %.3f (expected 100, 0.5, 0.5)" % (station[0], offset[0], distance[0]))
+	return abs(station[0] - 100) < 1E-9 and abs(offset[0] - 0.5) < 1E-9
+
+#random walks mixing short and long edges, queried near and far
+def randomWalks(trials=40, queries=500, seed=1):
+
+	rng = np.random.RandomState(seed)
+	worst = 0.0
+	for trial in range(trials):
+		count = rng.randint(3, 300)
+		points = np.cumsum(rng.normal(size=(count, 3)) * rng.choice([0.5, 5, 80], size=(count, 1)), axis=0)
+		points[:, 2] *= 0.1
+		index = CenterlineIndex(points, cyclic=bool(trial % 2))
+
+		query = points[rng.randint(0, count, queries)] + rng.normal(size=(queries, 3)) * rng.choice([1, 20, 300])
+		station, offset, distance = index.project(query)
+		worst = max(worst, np.abs(distance - bruteForceDistance(index, query)).max())
+
+	print("random walks: worst distance error %g" % worst)
+	return worst < 1E-9
+
+def main():
+
+	passed = longStraight() & randomWalks()
+	print("ok" if passed else "FAILED")
+	sys.exit(0 if passed else 1)
+
+if __name__ == "__main__":
+	main()
@@ -4,28 +4,268 @@ import numpy as np
 from mathutils import Vector
 import json
 
+# the sample file format is shared with the track tool add-on modules, see README.md
+import curve_io
+
 MAXIMUM_VIEW_RAIDUS = 500
 
-class SampleVertex:
+#Cubic bezier in power basis: B(t) = [1, t, t^2, t^3] . BEZIER_BASIS . [p0, p1, p2, p3]
+BEZIER_BASIS = np.array([
+	[ 1,  0,  0, 0],
+	[-3,  3,  0, 0],
+	[ 3, -6,  3, 0],
+	[-1,  3, -3, 1]], dtype=np.float64)
+
+#Below this speed / |B' x B''| a sample counts as degenerate (handle on its control point, straight segment)
+DEGENERATE_EPSILON = 1E-9
+
+def unitVectors(vectors, norms, fallback):
+	ok = norms > DEGENERATE_EPSILON
+	return np.where(ok[..., None], vectors / np.where(ok, norms, 1)[..., None], fallback)
+
+#Array version of BezierSegment.getdetail for (N, 4, 3) segments at every t in ts, all in one pass
+#Returns co, tangent, normal, binormal as (N, len(ts), 3) and signed curvature as (N, len(ts))
+#	zero speed (a handle sitting on its control point): tangent follows B'', or the chord if that vanishes too
+#	straight pieces (B' x B'' = 0): curvature 0 and binormal (0, 0, 1) as SampleBuffer's default
+def bezierFrames(segments, ts):
+	segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4, 3)
+	ts = np.asarray(ts, dtype=np.float64)
+	zeros = np.zeros_like(ts)
+	ones = np.ones_like(ts)
+
+	position = np.stack((ones, ts, ts * ts, ts * ts * ts), axis=1).dot(BEZIER_BASIS)
+	speed = np.stack((zeros, ones, 2 * ts, 3 * ts * ts), axis=1).dot(BEZIER_BASIS)
+	accel = np.stack((zeros, zeros, 2 * ones, 6 * ts), axis=1).dot(BEZIER_BASIS)
+
+	co = np.einsum('rk,nkd->nrd', position, segments)
+	v = np.einsum('rk,nkd->nrd', speed, segments)
+	vprime = np.einsum('rk,nkd->nrd', accel, segments)
+
+	vnorm = np.linalg.norm(v, axis=2)
+	cross = np.cross(v, vprime)
+	crossnorm = np.linalg.norm(cross, axis=2)
+
+	chord = np.broadcast_to((segments[:, 3] - segments[:, 0])[:, None, :], v.shape)
+	chord = unitVectors(chord, np.linalg.norm(chord, axis=2), np.array((1.0, 0.0, 0.0)))
+	# B'(t) ~ B''(t0) (t - t0) next to a zero-speed t0, so the limit tangent flips sign at the segment's far end
+	limit = vprime * np.where(ts < 0.5, 1.0, -1.0)[None, :, None]
+	tangent = unitVectors(limit, np.linalg.norm(vprime, axis=2), chord)
+	tangent = unitVectors(v, vnorm, tangent)
+
+	curving = (vnorm > DEGENERATE_EPSILON) & (crossnorm > DEGENERATE_EPSILON)
+	k = np.where(curving, crossnorm / np.where(curving, vnorm, 1) ** 3, 0)
+	# same sign convention as getdetail: negative when turning clockwise in plan view
+	k = np.where(cross[..., 2] < 0, -k, k)
+
+	binormal = unitVectors(cross, np.where(curving, crossnorm, 0), np.array((0.0, 0.0, 1.0)))
+	normal = np.cross(binormal, tangent)
+
+	return co, tangent, normal, binormal, k
+
+#Below this rate of curvature change (1/m^2) a clothoid is evaluated as an arc
+CLOTHOID_MINIMUM_SHARPNESS = 1E-12
+
+#Fresnel integrals C(x) = int_0^x cos(pi t^2 / 2) dt and S(x) = int_0^x sin(pi t^2 / 2) dt for any array x
+#	power series below |x| = 1.5, continued fraction of the complementary error function above (Numerical Recipes, frenel)
+def fresnel(x):
+
+	x = np.asarray(x, dtype=np.float64)
+	ax = np.abs(x).ravel()
+	c = np.zeros(ax.shape)
+	s = np.zeros(ax.shape)
+
+	small = ax <= 1.5
+	if small.any():
+		z = ax[small]
+		fact = 0.5 * math.pi * z * z
+		term = z.copy()
+		c[small] = z
+		for n in range(1, 40):
+			term = term * fact / n
+			value = term / (2 * n + 1)
+			sign = 1 if n % 4 < 2 else -1
+			if n % 2:
+				s[small] += sign * value
+			else:
+				c[small] += sign * value
+			if np.all(term < 1E-17 * np.abs(z)):
+				break
+
+	large = ~small
+	if large.any():
+		z = ax[large]
+		pix2 = math.pi * z * z
+		b = 1.0 - 1j * pix2
+		cc = np.full(z.shape, 1E30 + 0j)
+		d = 1.0 / b
+		h = d.copy()
+		n = -1
+		for k in range(2, 200):
+			n += 2
+			an = -n * (n + 1.0)
+			b = b + 4.0
+			d = 1.0 / (an * d + b)
+			cc = b + an / cc
+			delta = cc * d
+			h = h * delta
+			if np.all(np.abs(delta.real - 1.0) + np.abs(delta.imag) < 1E-16):
+				break
+		h = (z - 1j * z) * h
+		cs = (0.5 + 0.5j) * (1.0 - np.exp(0.5j * pix2) * h)
+		c[large] = cs.real
+		s[large] = cs.imag
+
+	sign = np.where(x.ravel() < 0, -1.0, 1.0)
+	return (c * sign).reshape(x.shape), (s * sign).reshape(x.shape)
+
+#Position, heading and curvature along a spiral whose curvature goes linearly from k0 to k1 over length
+#	theta(s) = k0*s + a*s^2/2 with a = (k1 - k0) / length, completing the square turns
+#	integral of exp(i*theta) into a difference of Fresnel integrals
+def spiralPosition(s, k0, k1, length):
+
+	s = np.asarray(s, dtype=np.float64)
+	a = (k1 - k0) / length
+
+	theta = k0 * s + 0.5 * a * s * s
+	curvature = k0 + a * s
+
+	if math.fabs(a) < CLOTHOID_MINIMUM_SHARPNESS:
+		# arc (or line): chord of length s * sinc at the mid heading
+		position = s * np.sinc(k0 * s / (2 * math.pi)) * np.exp(0.5j * k0 * s)
+	else:
+		scale = math.sqrt(math.pi / math.fabs(a))
+		sign = math.copysign(1, a)
+		c0, s0 = fresnel(k0 / a / scale)
+		c1, s1 = fresnel((s + k0 / a) / scale)
+		position = scale * ((c1 - c0) + 1j * sign * (s1 - s0)) * np.exp(-0.5j * k0 * k0 / a)
+
+	co = np.column_stack((position.real, position.imag, np.zeros(position.size)))
+
+	return co, theta, curvature
+
+#Cubic bezier pieces (P, 4, 3) following curve (anything with evaluate(s)) between arc lengths starts and ends
+#	G1 hermite fit, handles along the end tangents with the circular-arc length 4/3 tan(dtheta/4) L/dtheta
+def fitBezierPieces(curve, starts, ends):
+
+	co0, theta0, k = curve.evaluate(starts)
+	co3, theta3, k = curve.evaluate(ends)
+	length = ends - starts
+	turn = theta3 - theta0
+
+	small = np.abs(turn) < 1E-9
+	handle = np.where(small, length / 3, 4.0 / 3 * np.tan(turn / 4) * length / np.where(small, 1, turn))
+
+	t0 = np.column_stack((np.cos(theta0), np.sin(theta0), np.zeros(len(starts))))
+	t3 = np.column_stack((np.cos(theta3), np.sin(theta3), np.zeros(len(starts))))
+
+	return np.stack((co0, co0 + handle[:, None] * t0, co3 - handle[:, None] * t3, co3), axis=1)
+
+#Largest distance from the curve to its bezier pieces, checked at `checks` interior stations of every piece
+def bezierPieceErrors(curve, starts, ends, pieces, checks=8, resolution=32):
+
+	fraction = np.linspace(0, 1, checks + 2)[1:-1]
+	truth, theta, k = curve.evaluate((starts[:, None] + (ends - starts)[:, None] * fraction).ravel())
+	truth = truth.reshape(len(starts), checks, 3)
+
+	ts = np.linspace(0, 1, resolution + 1)
+	position = np.stack((np.ones_like(ts), ts, ts * ts, ts * ts * ts), axis=1).dot(BEZIER_BASIS)
+	polyline = np.einsum('rk,nkd->nrd', position, pieces)
+
+	# distance of every true point to every chord of its piece's polyline
+	a = polyline[:, None, :-1]
+	ab = polyline[:, None, 1:] - a
+	ap = truth[:, :, None] - a
+	u = np.clip(np.sum(ap * ab, axis=3) / np.maximum(np.sum(ab * ab, axis=3), 1E-30), 0, 1)
+	distance = np.linalg.norm(ap - u[..., None] * ab, axis=3).min(axis=2)
+
+	return distance.max(axis=1)
+
+#Samples of a curve as contiguous arrays (structure of arrays) instead of one python object per sample
+#	co, tangent, normal, binormal are (M, 3), curvature is (M,)
+#	slicing returns a SampleBuffer of views into the same arrays, indexing or iterating gives SampleView
+class SampleBuffer:
+
+	def __init__(self, co, curvature=None, tangent=None, binormal=None, normal=None, dtype=np.float64):
+		self.co = np.asarray(co, dtype=dtype).reshape(-1, 3)
+		count = len(self.co)
+
+		self.curvature = np.zeros(count, dtype=dtype) if curvature is None else np.asarray(curvature, dtype=dtype).reshape(count)
+		self.tangent = np.tile(np.array((1, 0, 0), dtype=dtype), (count, 1)) if tangent is None else np.asarray(tangent, dtype=dtype).reshape(count, 3)
+		self.binormal = np.tile(np.array((0, 0, 1), dtype=dtype), (count, 1)) if binormal is None else np.asarray(binormal, dtype=dtype).reshape(count, 3)
+		# n = b x t
+		self.normal = np.cross(self.binormal, self.tangent) if normal is None else np.asarray(normal, dtype=dtype).reshape(count, 3)
+
+	@classmethod
+	def concatenate(cls, buffers):
+		#one allocation per field for the whole result, each input copied once
+		buffers = list(buffers)
+		if len(buffers) == 1:
+			return buffers[0]
+		return cls(np.concatenate([b.co for b in buffers]), np.concatenate([b.curvature for b in buffers]),
+			np.concatenate([b.tangent for b in buffers]), np.concatenate([b.binormal for b in buffers]),
+			np.concatenate([b.normal for b in buffers]), dtype=buffers[0].co.dtype)
+
+	def __len__(self):
+		return len(self.co)
+
+	def __getitem__(self, key):
+		if isinstance(key, (int, np.integer)):
+			if key < 0:
+				key += len(self)
+			if not 0 <= key < len(self):
+				raise IndexError('sample index out of range')
+			return SampleView(self, key)
+		return SampleBuffer(self.co[key], self.curvature[key], self.tangent[key], self.binormal[key], self.normal[key], dtype=self.co.dtype)
+
+	def __iter__(self):
+		for i in range(len(self)):
+			yield SampleView(self, i)
+
+#One sample of a SampleBuffer, read through to the buffer's arrays
+class SampleView:
+
+	__slots__ = ('buffer', 'index')
+
+	def __init__(self, buffer, index):
+		self.buffer = buffer
+		self.index = index
+
+	@property
+	def co(self):
+		return tuple(self.buffer.co[self.index].tolist())
+
+	@property
+	def curvature(self):
+		return float(self.buffer.curvature[self.index])
 
-	def __init__(self, co=(0,0,0), curvature=0, t=(1,0,0), b=(0,0,1)):
-		self.co = co
-		self.curvature = curvature
-		self.tangent = t
-		self.normal = (b[1]*t[2] - b[2]*t[1], b[2]*t[0] - b[0]*t[2], b[0]*t[1] - b[1]*t[0])
-		self.binormal = b #(t[1]*n[2]-t[2]*n[1], t[2]*n[0]-t[0]*n[2], t[0]*n[1] - t[1]*n[0])
+	@property
+	def tangent(self):
+		return tuple(self.buffer.tangent[self.index].tolist())
+
+	@property
+	def normal(self):
+		return tuple(self.buffer.normal[self.index].tolist())
+
+	@property
+	def binormal(self):
+		return tuple(self.buffer.binormal[self.index].tolist())
 
 class Curve:
 
 	def getsamplelength(self, coordinates):
 
-		total = 0
+		return self.getsamplestations(coordinates)[-1]
 
-		for i in range(len(coordinates) - 1):
+	#Cumulative arc length at every sample, build once and query with np.searchsorted instead of re-summing
+	def getsamplestations(self, coordinates):
 
-			total += self.distance(coordinates[i], coordinates[i + 1])
+		coordinates = np.asarray(coordinates, dtype=np.float64)
+		if len(coordinates) < 2:
+			return np.zeros(1)
 
-		return total
+		chords = np.linalg.norm(np.diff(coordinates, axis=0), axis=1)
+
+		return np.concatenate(([0.0], np.cumsum(chords)))
 
 	def distance(self, tuple1, tuple2):
 
@@ -49,58 +289,39 @@ class Curve:
 			for spline in curve.splines:
 				curve.splines.remove(spline)
 
+		co = samplevertices.co
+		k = samplevertices.curvature[:, None]
+		n = samplevertices.normal
+		b = samplevertices.binormal
+
+		# r = np.where(k == 0, MAXIMUM_VIEW_RAIDUS, np.minimum(1.0 / np.where(k == 0, 1, k), MAXIMUM_VIEW_RAIDUS))
+		# radiusend = co + r * n
+		curvatureend = co + k * n
+		# tangentend = co + samplevertices.tangent
+		# normalend = co + n
+		binormalend = co + b
+
+		ones = np.ones((len(co), 1))
+
+		# border interpolating the end points of curvature
 		curvatureouter = curve.splines.new('POLY')
 		curvatureouter.points.add(len(samplevertices) - 1)
+		curvatureouter.points.foreach_set('co', np.hstack((curvatureend, ones)).astype(np.float32).ravel())
 
-		for i in range(len(samplevertices)):
-			sample = samplevertices[i]
-			co = sample.co
-			if sample.curvature == 0:
-				r = MAXIMUM_VIEW_RAIDUS
-			else:
-				r = min(1.0 / sample.curvature, MAXIMUM_VIEW_RAIDUS)
-			k = sample.curvature
-			t = sample.tangent
-			n = sample.normal
-			b = sample.binormal
-			
-			radiusend = (co[0] + r*n[0], co[1] + r*n[1], co[2] + r*n[2])
-			curvatureend = (co[0] + k*n[0], co[1] + k*n[1], co[2] + k*n[2])
-			tangentend = (co[0] + t[0], co[1] + t[1], co[2] + t[2])
-			normalend = (co[0] + n[0], co[1] + n[1], co[2] + n[2])
-			binormalend = (co[0] + b[0], co[1] + b[1], co[2] + b[2])
-
-			# tangent at sample
-			# polyline = curve.splines.new('POLY')
-			# polyline.points.add(1)
-			# polyline.points[0].co = co + (1,)
-			# polyline.points[1].co = tangentend + (1,)
-
-			# normal at sample
-			# polyline = curve.splines.new('POLY')
-			# polyline.points.add(1)
-			# polyline.points[0].co = co + (1,)
-			# polyline.points[1].co = normalend + (1,)
+		# (start, end) of the 2-point splines drawn at every sample
+		binormalco = np.hstack((co, ones, binormalend, ones)).astype(np.float32)
+		curvatureco = np.hstack((co, ones, curvatureend, ones)).astype(np.float32)
 
+		for i in range(len(samplevertices)):
 			#binormal at sample
 			polyline = curve.splines.new('POLY')
 			polyline.points.add(1)
-			polyline.points[0].co = co + (1,)
-			polyline.points[1].co = binormalend + (1,)
+			polyline.points.foreach_set('co', binormalco[i])
 
 			# curvature pointing opposite to k*n
 			polyline = curve.splines.new('POLY')
 			polyline.points.add(1)
-			polyline.points[0].co = co + (1,)
-			polyline.points[1].co = curvatureend + (1,)
-			# border interpolating the end points of curvature
-			curvatureouter.points[i].co = curvatureend + (1,)
-
-			# radius at sample pointing to center
-			# polyline = curve.splines.new('POLY')
-			# polyline.points.add(1)
-			# polyline.points[0].co = co + (1,)
-			# polyline.points[1].co = radiusend + (1,)	
+			polyline.points.foreach_set('co', curvatureco[i])
 
 class Clothoid(Curve):
 
@@ -112,45 +333,34 @@ class Clothoid(Curve):
 
 	def sample(self):
 
-		k = (self.end_curvature - self.start_curvature) / self.length
-		step = self.length / self.resolution
-		s = 0
-		preS = 0
-		theta = 0
-		vertices = []
+		s = np.linspace(0, self.length, self.resolution + 1)
+		co, theta, curvature = self.evaluate(s)
 
-		while s < self.length + step:
-
-			if s == 0:
-				vertices.append(SampleVertex((0,0,0), self.start_curvature))
-				s += step
-				continue
+		t = np.column_stack((np.cos(theta), np.sin(theta), np.zeros(len(s))))
+		sign = np.copysign(1, theta)
+		b = np.column_stack((-np.sin(theta) * sign, np.cos(theta) * sign, np.zeros(len(s))))
+		# b = (0, 0, 1)
 
-			if math.fabs(s - self.length) < 1E-4 or s > self.length:
-				s = self.length
+		return SampleBuffer(co, curvature, t, b)
 
-			preCoord = vertices[len(vertices) - 1].co
-			curvature = (s + preS) * 0.5 * k + self.start_curvature
+	#Exact position, heading and curvature at arc lengths s (any array), starting at the origin heading +x
+	def evaluate(self, s):
 
-			x = preCoord[0] + (s - preS) * math.cos(theta + curvature * (s - preS) / 2)
-			y = preCoord[1] + (s - preS) * math.sin(theta + curvature * (s - preS) / 2)
-			z = preCoord[2]
+		return spiralPosition(s, self.start_curvature, self.end_curvature, self.length)
 
-			theta += curvature * (s - preS)
-			preS = s
-			s += step
+	def convert2bezier(self):
 
-			t = (math.cos(theta), math.sin(theta), 0)
-			b = (-math.sin(theta) * math.copysign(1, theta), math.cos(theta) * math.copysign(1, theta), 0)
-			# b = (0, 0, 1)
-			
-			vertices.append(SampleVertex((x, y, z), curvature, t, b))
+		segment = fitBezierPieces(self, np.zeros(1), np.full(1, self.length))[0]
+		p0, p1, p2, p3 = [tuple(p) for p in segment]
 
-		return vertices
+		p0left = (2 * p0[0] - p1[0], 2 * p0[1] - p1[1], 2 * p0[2] - p1[2])
+		p3right = (2 * p3[0] - p2[0], 2 * p3[1] - p2[1], 2 * p3[2] - p2[2])
 
-	def convert2bezier(self):
+		bezpoint1 = BezierControl(p0, p0left, p1)
+		bezpoint2 = BezierControl(p3, p2, p3right)
+		beziercurve = BezierSegment(bezpoint1, bezpoint2)
 
-		pass
+		return beziercurve
 
 class Arc(Curve):
 
@@ -166,18 +376,15 @@ class Arc(Curve):
 		s = 0; preS = 0
 		theta = 0
 		curvature = 1.0 / self.radius
-		vertices = []
+		co = [(0,0,0)]; tangents = [(1,0,0)]; binormals = [(0,0,1)]
+		s += step
 
 		while s < self.length + step:
-			if s == 0:
-				vertices.append(SampleVertex((0,0,0), curvature))
-				s += step
-				continue
 
 			if math.fabs(s - self.length) < 1E-4 or s > self.length:
 				s = self.length
 
-			preCoord = vertices[len(vertices) - 1].co
+			preCoord = co[-1]
 
 			x = preCoord[0] + (s - preS) * math.cos(theta + (s - preS) / self.radius / 2)
 			y = preCoord[1] + (s - preS) * math.sin(theta + (s - preS) / self.radius / 2)
@@ -191,9 +398,13 @@ class Arc(Curve):
 			b = (-math.sin(theta) * math.copysign(1, theta), math.cos(theta) * math.copysign(1, theta), 0)
 			# b = (0, 0, 1)
 
-			vertices.append(SampleVertex((x, y, z), curvature, t, b))
+			co.append((x, y, z)); tangents.append(t); binormals.append(b)
+
+		return SampleBuffer(co, np.full(len(co), curvature), tangents, binormals)
+
+	def evaluate(self, s):
 
-		return vertices
+		return spiralPosition(s, 1.0 / self.radius, 1.0 / self.radius, self.length)
 
 	def convert2bezier(self):
 		
@@ -241,6 +452,16 @@ class Arc(Curve):
 
 		return beziercurve
 
+class Line(Curve):
+
+	def __init__(self, length):
+		self.length = length
+		self.resolution = 1
+
+	def evaluate(self, s):
+
+		return spiralPosition(s, 0, 0, self.length)
+
 class BezierControl:
 
 	def __init__(self, co, handle_left, handle_right, tilt=0, radius=1):
@@ -258,22 +479,15 @@ class BezierSegment(Curve):
 		self.resolution = 24
 
 	#SampleVertex resolution should be related to curvature changing rate (the largest curvature of the curve defines the resolution)
+	#track_tool's Sample2Poly has an adaptive mode doing this (track_geometry.flatten_segment_ends)
 	def sample(self):
-		vertices = []
-		p0 = self.bezpoint_left.co
-		p1 = self.bezpoint_left.handle_right
-		p2 = self.bezpoint_right.handle_left
-		p3 = self.bezpoint_right.co
-		
-		for t in np.linspace(0, 1, self.resolution + 1):
-			x = (1-t)*(1-t)*(1-t)*p0[0] + 3*(1-t)*(1-t)*t*p1[0] + 3*(1-t)*t*t*p2[0] + t*t*t*p3[0]
-			y = (1-t)*(1-t)*(1-t)*p0[1] + 3*(1-t)*(1-t)*t*p1[1] + 3*(1-t)*t*t*p2[1] + t*t*t*p3[1]
-			z = (1-t)*(1-t)*(1-t)*p0[2] + 3*(1-t)*(1-t)*t*p1[2] + 3*(1-t)*t*t*p2[2] + t*t*t*p3[2]
-			curvature, t, b = self.getdetail(t)
-			vertex = SampleVertex((x, y, z), curvature, t, b)
-			vertices.append(vertex)
+		co, t, n, b, k = bezierFrames(self.getcontrols(), np.linspace(0, 1, self.resolution + 1))
 
-		return vertices
+		return SampleBuffer(co[0], k[0], t[0], b[0], n[0])
+
+	#(4, 3) array of p0, p1, p2, p3
+	def getcontrols(self):
+		return np.array((self.bezpoint_left.co, self.bezpoint_left.handle_right, self.bezpoint_right.handle_left, self.bezpoint_right.co), dtype=np.float64)
 
 	#Get Cubic Bezier's curvature, and the curve's b, n, t vector, using first and second derivitive
 	#Ref https://math.libretexts.org/Core/Calculus/Vector_Calculus/2%3A_Vector-Valued_Functions_and_Motion_in_Space/2.3%3A_Curvature_and_Normal_Vectors_of_a_Curve
@@ -286,32 +500,13 @@ class BezierSegment(Curve):
 		# k = |dT / ds|
 		# 	= || B'(t) x B''(t) || / || B'(t) ||^3
 
-		p0 = self.bezpoint_left.co
-		p1 = self.bezpoint_left.handle_right
-		p2 = self.bezpoint_right.handle_left
-		p3 = self.bezpoint_right.co
-
-		vx, vy, vz = self.getspeed(t)
-		vnorm = self.distance((0,0,0),(vx, vy, vz))
-
-		vprimex, vprimey ,vprimez = self.getderivitive2(t)
-		vprimenorm =self.distance((0,0,0), (vprimex, vprimey, vprimez))
-
-		crossx = vy * vprimez - vz * vprimey
-		crossy = vz * vprimex - vx * vprimez
-		crossz = vx * vprimey - vy * vprimex
-		crossnorm = self.distance((0,0,0), (crossx, crossy, crossz))
-
-		k = crossnorm / math.pow(vnorm, 3)
+		co, tangent, normal, binormal, k = bezierFrames(self.getcontrols(), (t,))
 
 		# ez = t x n, v x vprime = k|v|^3 * t x n
 		# curve r(t)'s second derivitvie of t always point to the center of the curve, while on the x-y plane, normal vector n points to left if follows tangent vector t
-		if crossz < 0:
-			k *= -1
-
-		t = (vx/vnorm, vy/vnorm, vz/vnorm)
-		b = (crossx/crossnorm, crossy/crossnorm, crossz/crossnorm)
-		# b = (0, 0, 1)
+		k = float(k[0, 0])
+		t = tuple(tangent[0, 0])
+		b = tuple(binormal[0, 0])
 
 		return k, t, b
 
@@ -350,27 +545,31 @@ class BezierSpline(Curve):
 	def get_segments_samples(self):
 
 		segments = []
-		sample_vertices = []
 
 		for index in range(len(self.spline.bezier_points) - 1):
 
-			segment, samples = self.sample_segment(index, index + 1)
-			segments.append(segment)
-
-			if len(sample_vertices) == 0:
-				sample_vertices.append(samples[0])
-			
-			sample_vertices += samples[1:]
+			segments.append(self.get_segment(index, index + 1))
 
 		if self.spline.use_cyclic_u:
 
-			segment, samples = self.sample_segment(len(self.spline.bezier_points) - 1, 0)
-			segments.append(segment)
-			sample_vertices += samples[1:-1]
+			segments.append(self.get_segment(len(self.spline.bezier_points) - 1, 0))
 
-		return segments, sample_vertices
+		if len(segments) == 0:
+			return segments, SampleBuffer(np.zeros((0, 3)))
 
-	def sample_segment(self, ctrlPnt_index, nextCtrlPnt_index):
+		# the whole spline's frames in a single pass
+		resolution = segments[0].resolution
+		co, t, n, b, k = bezierFrames([segment.getcontrols() for segment in segments], np.linspace(0, 1, resolution + 1))
+
+		# shared end points once, the closing point of a cyclic spline is the first one
+		keep = np.ones(k.shape, dtype=bool)
+		keep[1:, 0] = False
+		if self.spline.use_cyclic_u:
+			keep[-1, -1] = False
+
+		return segments, SampleBuffer(co[keep], k[keep], t[keep], b[keep], n[keep])
+
+	def get_segment(self, ctrlPnt_index, nextCtrlPnt_index):
 
 		ctrlPnt = self.spline.bezier_points[ctrlPnt_index]
 		nextPnt = self.spline.bezier_points[nextCtrlPnt_index]
@@ -378,10 +577,89 @@ class BezierSpline(Curve):
 		bezpoint_left = BezierControl(ctrlPnt.co, ctrlPnt.handle_left, ctrlPnt.handle_right, ctrlPnt.tilt, ctrlPnt.radius)
 		bezpoint_right = BezierControl(nextPnt.co, nextPnt.handle_left, nextPnt.handle_right, nextPnt.tilt, nextPnt.radius)
 
-		segment = BezierSegment(bezpoint_left, bezpoint_right)
-		samples = segment.sample()
+		return BezierSegment(bezpoint_left, bezpoint_right)
+
+#Rotation by angle around z
+def planRotation(angle):
 
-		return segment, samples
+	return np.array(((math.cos(angle), -math.sin(angle), 0), (math.sin(angle), math.cos(angle), 0), (0, 0, 1)))
+
+#Lay a sequence of Line / Arc / Clothoid elements end to end and fit one bezier spline to the whole track
+#	every element starts at the previous one's end position and heading (G1), a curvature jump between
+#	elements (not G2) is reported; pieces are halved per element until all are within tolerance
+#Returns the list of BezierControl and whether the track closes on itself
+def compileTrack(elements, tolerance=0.01, location=(0, 0, 0), heading=0.0, max_iterations=16):
+
+	# pose (position, heading) at the start of every element
+	origins = [np.asarray(location, dtype=np.float64)]
+	headings = [heading]
+	for index, element in enumerate(elements):
+		co, theta, k = element.evaluate(np.array((0.0, element.length)))
+		origins.append(origins[-1] + planRotation(headings[-1]).dot(co[1]))
+		headings.append(headings[-1] + theta[1])
+
+		if index + 1 < len(elements):
+			following = elements[index + 1].evaluate(np.zeros(1))[2][0]
+			if math.fabs(k[1] - following) > 1E-6:
+				print('Curvature jump of %f between element %d and %d' % (following - k[1], index, index + 1))
+
+	winding = ((headings[-1] - headings[0] + math.pi) % (2 * math.pi)) - math.pi
+	closed = np.linalg.norm(origins[-1] - origins[0]) < tolerance and math.fabs(winding) < 1E-6
+
+	# a single cubic can not follow more than a quarter turn
+	counts = [max(1, int(math.ceil(math.fabs(element.evaluate(np.array((element.length,)))[1][0]) / (math.pi / 2)))) for element in elements]
+
+	for iteration in range(max_iterations):
+		pieces = []
+		refine = False
+		for index, element in enumerate(elements):
+			stations = np.linspace(0, element.length, counts[index] + 1)
+			local = fitBezierPieces(element, stations[:-1], stations[1:])
+			errors = bezierPieceErrors(element, stations[:-1], stations[1:], local)
+			if errors.max() > tolerance and iteration + 1 < max_iterations:
+				counts[index] *= 2
+				refine = True
+
+			pieces.append(local.dot(planRotation(headings[index]).T) + origins[index])
+
+		if not refine:
+			break
+
+	pieces = np.concatenate(pieces)
+
+	controls = []
+	for index, piece in enumerate(pieces):
+		left = pieces[index - 1][2] if index > 0 else 2 * piece[0] - piece[1]
+		controls.append(BezierControl(tuple(piece[0].tolist()), tuple(left.tolist()), tuple(piece[1].tolist())))
+
+	if closed:
+		controls[0].handle_left = tuple(pieces[-1][2].tolist())
+	else:
+		end = pieces[-1]
+		controls.append(BezierControl(tuple(end[3].tolist()), tuple(end[2].tolist()), tuple((2 * end[3] - end[2]).tolist())))
+
+	return controls, closed
+
+#Write compiled track controls into a new bezier curve object, bulk through foreach_set
+def makeBezierCurve(name, controls, cyclic=False):
+
+	curve = bpy.data.curves.new(name=name, type='CURVE')
+	curve.dimensions = '3D'
+
+	obj = bpy.data.objects.new(name, curve)
+	obj.location = (0, 0, 0)
+	bpy.context.scene.objects.link(obj)
+
+	spline = curve.splines.new('BEZIER')
+	spline.bezier_points.add(len(controls) - 1)
+	for attribute in ('co', 'handle_left', 'handle_right'):
+		spline.bezier_points.foreach_set(attribute, np.array([getattr(c, attribute) for c in controls], dtype=np.float32).ravel())
+	for point in spline.bezier_points:
+		point.handle_left_type = 'ALIGNED'
+		point.handle_right_type = 'ALIGNED'
+	spline.use_cyclic_u = cyclic
+
+	return obj
 
 def getActiveObject():
 
@@ -419,32 +697,37 @@ def sampleBezierObj(obj):
 		for spline in sampledobj.data.splines:
 			sampledobj.data.splines.remove(spline)
 
-	vertices = []
+	buffers = []
 	for spline in obj.data.splines:
 		bezspline = BezierSpline(spline)
 		samples = bezspline.sample_vertices
-		vertices += samples
+		buffers.append(samples)
 		bezspline.viewcurvature(samples, sampledobj)
 
 		polyline = sampledobj.data.splines.new('POLY')
 		polyline.points.add(len(samples) - 1)
-		for i in range(len(samples)):
-			polyline.points[i].co = samples[i].co + (1,)
+		polyline.points.foreach_set('co', np.hstack((samples.co, np.ones((len(samples), 1)))).astype(np.float32).ravel())
+
+	return SampleBuffer.concatenate(buffers)
+
+#Binary sample file, format and memory mapped reader in curve_io so tools without blender can read it too
+def saveSampleVertices(samples, filename='//samples.smpv'):
+
+	fields = dict((field, getattr(samples, field)) for field, width in curve_io.SAMPLE_FILE_FIELDS)
+	curve_io.write_sample_file(bpy.path.abspath(filename), fields)
 
-	return vertices
+#Memory mapped SampleBuffer of a file written by saveSampleVertices, nothing is read until a field is used
+def loadSampleVertices(filename='//samples.smpv'):
 
-def saveSampleVertices(samples):
+	fields = curve_io.read_sample_file(bpy.path.abspath(filename))
+	return SampleBuffer(fields['co'], fields['curvature'], fields['tangent'], fields['binormal'], fields['normal'], dtype=fields['co'].dtype)
 
-	f = open('D:\Documents\Blender\data\samples.csv', 'w')
-	f.write('co.x, co.y, co.z, curvautre, tangent.x, tangent.y, tangent.z, binormal.x, binormal.y, binormal.z\n')
-	for sample in samples:
-		f.write(str(sample.co[0]) + ',' + str(sample.co[1]) + ',' + str(sample.co[2]) + ',')
-		f.write(str(sample.curvature) + ',')
-		f.write(str(sample.tangent[0]) + ',' + str(sample.tangent[1]) + ',' + str(sample.tangent[2]) + ',')
-		f.write(str(sample.binormal[0])+ ',' + str(sample.binormal[1]) + ',' + str(sample.binormal[2]))
-		f.write('\n')
+#Text export of the same samples, for spreadsheets
+def saveSampleVerticesText(samples, filename='//samples.csv'):
 
-	f.close()
+	columns = np.column_stack((samples.co, samples.curvature, samples.tangent, samples.binormal))
+	np.savetxt(bpy.path.abspath(filename), columns, delimiter=',', comments='',
+		header='co.x, co.y, co.z, curvautre, tangent.x, tangent.y, tangent.z, binormal.x, binormal.y, binormal.z')
 
 def main():
 	clothoid = Clothoid(10, 0, 0.1)
@@ -1,6 +1,10 @@
 import bpy
 import bmesh
 
+# needs the track tool add-on modules installed, see README.md
+import mesh_io
+import track_geometry
+
 """
 bmesh design doc: 
 https://wiki.blender.org/index.php/Dev:Source/Modeling/BMesh/Design
@@ -18,23 +22,22 @@ challeges:
 
 def main():
 	obj = bpy.context.active_object
+	me = obj.data
 
-	if obj.mode == 'OBJECT':
-		bpy.ops.object.mode_set(mode='EDIT')
-	
+	# one time build only from set of equal resolution mesh circles to add faces along z
+	# (faces are appended to the mesh data, which needs object mode)
+	if obj.mode == 'EDIT':
+		bpy.ops.object.mode_set(mode='OBJECT')
+	add_side_faces(me, 4, 32)
+
+	bpy.ops.object.mode_set(mode='EDIT')
 	bpy.ops.mesh.select_all(action='DESELECT')
 	
-	me = obj.data	
 	bm = bmesh.from_edit_mesh(me)
 
 	# show number of verts, edges, and faces and other properties/values
 	detail(bm)
 
-	# one time build only from set of equal resolution mesh circles to add faces along z
-	add_side_faces(bm, 4, 32)
-
-	detail(bm)
-
 	selectv(bm, 0, 0)
 	selecte(bm, 0, 0)
 	selectf(bm, 0, 0)
@@ -125,27 +128,15 @@ def selectf(bm, start, end):
 		print(dir(face))
 		face.select_set(True)
 
-def add_side_faces(bm, rings, resolution):
+def add_side_faces(me, rings, resolution):
 	"""
 	works only for sets of equal resolution mesh circles to add faces along z
+	all quads are built as one index array and appended in one go, faces already in the mesh are skipped
 	"""
-	if hasattr(bm.verts, "ensure_lookup_table"):
-		bm.verts.ensure_lookup_table()
-
-	for i in range(rings - 1):
-		for j in range(resolution):
-			offset = i * resolution
-			verts = [j, (j + 1) % resolution, (j + 1) % resolution + resolution, j + resolution]
-			verts = [index + offset for index in verts]
-			try:
-				face = bm.faces.new([bm.verts[i] for i in verts])
-				# face.normal_update()
-			except:
-				print('Face error (already exists): %s' % verts)
-				# for vert in verts:
-				# 	bm.verts[vert].select_set(True)
-	
-	bm.normal_update()
+	faces = track_geometry.ring_quads(rings, resolution)
+	faces = track_geometry.new_faces(faces, mesh_io.read_polygons(me, 4))
+	print('Adding %d side faces' % len(faces))
+	mesh_io.add_polygons(me, faces)
 
 def detail_loop(bm, face_index):
 	"""exploit detail of a loop belonged to a certain face"""
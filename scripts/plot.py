@@ -1,22 +1,20 @@
+import os
+import sys
+import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 
-def readCSV(filename):
+# the chunked csv reader lives with the blender add-ons, it does not need bpy
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'plugins'))
+from curve_io import CenterlineCSV
 
-	xarray = []
-	yarray = []
-	zarray = []
+def readCSV(filename, trackname=None):
 
-	with open(filename, 'r') as f:
-		for line in f:
-			if (line[0] == 'T'):
-				continue
-			x, y , z = [float(s) for s in line.split(',')]
-			xarray.append(x)
-			yarray.append(y)
-			zarray.append(z)
+	reader = CenterlineCSV(filename)
+	names = reader.names if trackname is None else [trackname]
+	points = np.concatenate([reader.read(name) for name in names])
 
-	return xarray, yarray, zarray
+	return points[:, 0], points[:, 1], points[:, 2]
 
 def main():
 
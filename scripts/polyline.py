@@ -1,4 +1,5 @@
 import bpy
+import numpy as np
 from mathutils import Vector
 
 w = 1 # weight
@@ -16,8 +17,10 @@ def MakePolyLine(objname, curvename, cList):
 
 	polyline = curvedata.splines.new('POLY')
 	polyline.points.add(len(cList)-1)
-	for num in range(len(cList)):
-		x, y, z = cList[num]
-		polyline.points[num].co = (x, y, z, w)
+	# one flat (x, y, z, w) buffer for all points instead of a write per point
+	co = np.ones((len(cList), 4), dtype=np.float32)
+	co[:, :3] = cList
+	co[:, 3] = w
+	polyline.points.foreach_set('co', co.ravel())
 
 MakePolyLine("Track", "Central Line", cList)
\ No newline at end of file
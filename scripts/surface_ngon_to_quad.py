@@ -1,49 +1,32 @@
 import bpy
-import bmesh
-import mathutils
+
+# needs the track tool add-on modules installed, see README.md
+import mesh_io
+import track_geometry
 
 obj = bpy.context.scene.objects.active
+bpy.ops.object.mode_set(mode='OBJECT')
 me = obj.data
-bm = bmesh.from_edit_mesh(me)
-
-edges_to_remove = []
-is_vindex_in_order = True
-
-# delete all edges that is not a boundary (linked faces auto removed)
-if bm.faces:
-    print('Removing all internal faces and edges')
-    for edge in bm.edges:
-        if not edge.is_boundary:
-            edges_to_remove.append(edge)
-
-    for edge in edges_to_remove:
-        bm.edges.remove(edge)
-
-if not bm.faces:
-    # with only boundary edge left, wave them to faces
-    for vindex, vert in enumerate(bm.verts):
-        #print(vindex, vert)
-        if vindex != vert.index:
-            is_vindex_in_order = False
-            break
-
-    if is_vindex_in_order:
-        # wave
-        # v1 - v0
-        #  | - |
-        # v3 - v2
-        for vert in bm.verts:
-            if vert.index % 2:
-                continue
-            v0 = vert
-            v1 = bm.verts[(vert.index + 1) % len(bm.verts)]
-            v2 = bm.verts[(vert.index + 2) % len(bm.verts)]
-            v3 = bm.verts[(vert.index + 3) % len(bm.verts)]
-            bm.faces.new([v0, v1, v3, v2])
-
-    else:
-        print('Error: Cannot wave according to vertex index, out of order')
-        raise RuntimeError('Cannot wave according to vertex index, out of order')
 
-bm.normal_update()
-bmesh.update_edit_mesh(me)
\ No newline at end of file
+# quads between the rows of the surface, or woven between its two boundary rails whatever order its vertices are in
+verts = mesh_io.read_float_attribute(me.vertices, 'co', 3)
+edges = mesh_io.read_int_attribute(me.edges, 'vertices', 2)
+loop_edge = mesh_io.read_int_attribute(me.loops, 'edge_index')
+loop_vertex = mesh_io.read_int_attribute(me.loops, 'vertex_index')
+
+strip = track_geometry.rebuild_strip(verts, edges, loop_edge, loop_vertex)
+if strip is None:
+    print('Error: Vertices are neither in rows nor all on two boundary rails of equal vertex count, cannot wave')
+    raise RuntimeError('Vertices are neither in rows nor all on two boundary rails of equal vertex count, cannot wave')
+verts, faces = strip
+
+# geometry cannot be removed through RNA, fill a new mesh and swap it in
+quads = bpy.data.meshes.new(me.name)
+for material in me.materials:
+    quads.materials.append(material)
+mesh_io.write_polygon_mesh(quads, verts, faces)
+obj.data = quads
+if me.users == 0:
+    bpy.data.meshes.remove(me)
+
+bpy.ops.object.mode_set(mode='EDIT')